@@ -0,0 +1,318 @@
+########## Libraries ##########
+import sys
+import os
+import json
+import time
+import platform
+import tracemalloc
+import numpy as np
+
+########## Globals ##########
+"""
+    Paths_Instances, Paths_OPT
+        Directories of the bundled TSP instances and the files
+        with their optimal values ('name : value').
+    Synthetic_Sizes
+        Random uniform instances (EUC_2D, coordenates in a square
+        of side 1e6) added to the bundled ones.
+    Matrix_dtype
+        Distance matrix type (TSPLIB rounded distances).
+    Seed, Repeats, Min_Seconds
+        Seed of every random choice (instances, tours, solvers),
+        repetitions of the timings (the fastest one is kept) and
+        shortest timed sample: quick functions are called several
+        times per sample and solver runs are repeated while they
+        take less than Repeats * Min_Seconds in total, so the
+        small instances are not dominated by timer noise.
+    TS_Calls, TS_Params, TS_Kwargs, GLS_Calls, GLS_Params, GLS_Kwargs
+        Fixed budgets, parameters after MaxOFcalls and options of
+        the solver runs (as in TabuTest.py and GLSTest.py).
+    Memory_Calls
+        Budget of the extra run that measures the peak memory (the
+        big arrays are allocated at the start of a run).
+    Large_Nodes, Candidates
+        From Large_Nodes cities on, the 2-opt neighborhoods are
+        restricted to Candidates nearest neighbors (the full one
+        does not fit in a benchmark).
+    Time_Tolerance, Gap_Tolerance
+        Relative slowdown (timings, throughputs and peak memory)
+        and absolute gap increase flagged as regressions. The
+        baseline is only comparable on the same idle machine; on
+        shared virtual machines the timings of the small instances
+        can vary more than Time_Tolerance between runs.
+    Path_Results, Path_Baseline
+        JSON file of the last run and saved baseline.
+    Usage
+        python Benchmark.py            runs and writes Path_Results
+        python Benchmark.py baseline   runs and writes Path_Baseline
+        python Benchmark.py compare    runs, writes Path_Results and
+                                       reports the regressions against
+                                       Path_Baseline (exit status 1)
+"""
+Paths_Instances = ["Instances/Parametrizacion", "Instances/Experimental"]
+Paths_OPT = ["Optimals/Parametrizacion/Optimals.txt", "Optimals/Experimental/Optimals.txt"]
+Synthetic_Sizes = [500, 1000, 5000]
+Matrix_dtype = "int32"
+Seed = 2024
+Repeats = 5
+Min_Seconds = 0.2
+TS_Calls = 300000
+TS_Params = (10, 0.001)
+TS_Kwargs = {'InitialStrategy': 'insertion'}
+GLS_Calls = 50000
+GLS_Params = (0.2,)
+GLS_Kwargs = {'InitialStrategy': 'insertion', 'FastLocalSearch': True}
+Memory_Calls = 20000
+Large_Nodes = 1000
+Candidates = 10
+Time_Tolerance = 0.25
+Gap_Tolerance = 0.005
+Path_Results = 'Results/Benchmarks/benchmark.json'
+Path_Baseline = 'Results/Benchmarks/baseline.json'
+
+########## Own files ##########
+# Path from the workspace.
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Libraries'))
+from ReadTSP import ParseTsp, BuildDistanceMatrix, ReadOptimals # type: ignore
+from TabuSearch import ObjFun, ObjFun_batch, get_neighbors_2opt # type: ignore
+from TabuSearch import TabuSearch # type: ignore
+from GLS import Guided_Local_Search # type: ignore
+from Candidates import candidate_lists # type: ignore
+from Instrumentation import Budget # type: ignore
+
+# Metric: +1 when a larger value is better, -1 when a smaller one is.
+METRICS = {
+    'matrix_build_s': -1,
+    'objfun_per_s': 1,
+    'objfun_batch_tours_per_s': 1,
+    'scan_ms': -1,
+    'scan_moves_per_s': 1,
+    'ts_iteration_ms': -1,
+    'ts_evaluations_per_s': 1,
+    'ts_peak_mb': -1,
+    'ts_gap': -1,
+    'gls_iteration_ms': -1,
+    'gls_evaluations_per_s': 1,
+    'gls_peak_mb': -1,
+    'gls_gap': -1,
+}
+
+########## Secundary functions ##########
+
+def read_optimals(filenames):
+    """
+    read_optimals (function)
+        Input: Files with lines 'name : value'.
+        Output: Dictionary of optimal values by instance name.
+    """
+    Optimals = {}
+    for filename in filenames:
+        Optimals.update(ReadOptimals(filename))
+    return Optimals
+
+def bundled_instances():
+    """
+    bundled_instances (function)
+        Output: List of (name, header, coordenates, weights) of the
+        instances in Paths_Instances, sorted by name.
+    """
+    Instances = []
+    for Path in Paths_Instances:
+        for file in sorted(os.listdir(Path)):
+            if file.endswith('.tsp'):
+                Header, Coordinates, Weights = ParseTsp(os.path.join(Path, file))
+                Instances.append((os.path.splitext(file)[0], Header, Coordinates, Weights))
+    return Instances
+
+def synthetic_instance(AmountNodes, rng):
+    """
+    synthetic_instance (function)
+        Input: Number of nodes and random generator.
+        Output: (name, header, coordenates, weights) of a random
+        uniform EUC_2D instance.
+    """
+    Coordinates = rng.uniform(0, 1e6, size=(AmountNodes, 2))
+    Header = {'DIMENSION': str(AmountNodes), 'EDGE_WEIGHT_TYPE': 'EUC_2D'}
+    return f"uniform{AmountNodes}", Header, Coordinates, None
+
+def fastest(Function, Repeats):
+    """
+    fastest (function)
+        Input: Function without arguments and repetitions.
+        Output: Shortest time in seconds of one call and the last
+        result.
+        Description: Every repetition calls Function as many times
+        as needed to last Min_Seconds (the count is doubled from
+        the first call, as timeit.autorange).
+    """
+    Start = time.perf_counter()
+    Result = Function()
+    Seconds = time.perf_counter() - Start
+    Number = 1
+    while Seconds * Number < Min_Seconds:
+        Number *= 2
+    Best = float('inf')
+    for _ in range(Repeats):
+        Start = time.perf_counter()
+        for _ in range(Number):
+            Result = Function()
+        Best = min(Best, (time.perf_counter() - Start) / Number)
+    return Best, Result
+
+########## Benchmarks ##########
+
+def bench_core(Header, Coordinates, Weights, rng):
+    """
+    bench_core (function)
+        Input: Instance (as ParseTsp gives it) and random generator.
+        Output: Distance matrix and the metrics of the matrix
+        build, ObjFun and the 2-opt neighborhood scan.
+    """
+    Seconds, D = fastest(lambda: BuildDistanceMatrix(Header, Coordinates, Weights, Matrix_dtype),
+                         Repeats)
+    n = len(D)
+    Metrics = {'nodes': n, 'matrix_build_s': Seconds}
+
+    Tours = np.array([rng.permutation(np.arange(1, n + 1)) for _ in range(100)])
+    Seconds, _ = fastest(lambda: [ObjFun(Tour, D) for Tour in Tours], Repeats)
+    Metrics['objfun_per_s'] = len(Tours) / Seconds
+    Seconds, _ = fastest(lambda: ObjFun_batch(Tours, D), Repeats)
+    Metrics['objfun_batch_tours_per_s'] = len(Tours) / Seconds
+
+    Lists = candidate_lists(Candidates, D) if n >= Large_Nodes else None
+    Seconds, Neighborhood = fastest(lambda: get_neighbors_2opt(Tours[0], D, Lists), Repeats)
+    Metrics['neighborhood'] = 'full' if Lists is None else f'candidates{Candidates}'
+    Metrics['scan_ms'] = 1e3 * Seconds
+    Metrics['scan_moves_per_s'] = len(Neighborhood[2]) / Seconds
+    return D, Metrics
+
+def bench_solver(Prefix, Solver, D, Calls, Params, Kwargs, Optimal):
+    """
+    bench_solver (function)
+        Input: Metric prefix, solver, distance matrix, calls,
+        parameters after MaxOFcalls, options and optimal value
+        (or None).
+        Output: Metrics of a run with a fixed seed: time per
+        iteration, evaluations/sec, peak memory (a second,
+        shorter run under tracemalloc), best cost and gap.
+        Description: Short runs are repeated (same seed, same
+        trajectory) and the fastest one is kept.
+    """
+    if len(D) >= Large_Nodes:
+        Kwargs = dict(Kwargs, Candidates=Candidates)
+    Report, Total = None, 0.0
+    for _ in range(Repeats):
+        Counter = Budget()
+        _, best_sol = Solver(D, len(D), Calls, *Params, rng=np.random.default_rng(Seed),
+                             Counter=Counter, **Kwargs)
+        Run = Counter.report()
+        if Report is None or Run['seconds'] < Report['seconds']:
+            Report = Run
+        Total += Run['seconds']
+        if Total >= Repeats * Min_Seconds:
+            break
+
+    tracemalloc.start()
+    Solver(D, len(D), Memory_Calls, *Params, rng=np.random.default_rng(Seed), **Kwargs)
+    _, Peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    Best = float(min(best_sol))
+    return {f'{Prefix}_iterations': Report['iterations'],
+            f'{Prefix}_iteration_ms': 1e3 * Report['seconds'] / max(Report['iterations'], 1),
+            f'{Prefix}_evaluations_per_s': Report['evaluations_per_sec'],
+            f'{Prefix}_peak_mb': Peak / 2**20,
+            f'{Prefix}_best': Best,
+            f'{Prefix}_gap': None if Optimal is None else (Best - Optimal) / Optimal}
+
+def run_benchmarks():
+    """
+    run_benchmarks (function)
+        Output: Dictionary with the environment and the metrics of
+        every instance.
+    """
+    rng = np.random.default_rng(Seed)
+    Optimals = read_optimals(Paths_OPT)
+    Instances = bundled_instances() + [synthetic_instance(n, rng) for n in Synthetic_Sizes]
+
+    # Warm-up (imports, first allocations, CPU clock), not recorded.
+    _, Header, Coordinates, Weights = synthetic_instance(60, np.random.default_rng(Seed))
+    D, _ = bench_core(Header, Coordinates, Weights, np.random.default_rng(Seed))
+    bench_solver('ts', TabuSearch, D, TS_Calls // 10, TS_Params, TS_Kwargs, None)
+    bench_solver('gls', Guided_Local_Search, D, GLS_Calls // 10, GLS_Params, GLS_Kwargs, None)
+
+    Results = {}
+    for Name, Header, Coordinates, Weights in Instances:
+        D, Metrics = bench_core(Header, Coordinates, Weights, np.random.default_rng(Seed))
+        Optimal = Optimals.get(Name)
+        Metrics.update(bench_solver('ts', TabuSearch, D, TS_Calls, TS_Params, TS_Kwargs, Optimal))
+        Metrics.update(bench_solver('gls', Guided_Local_Search, D, GLS_Calls, GLS_Params,
+                                    GLS_Kwargs, Optimal))
+        Results[Name] = Metrics
+        print(f"{Name}: " + ", ".join(f"{k} {v:.4g}" for k, v in Metrics.items()
+                                       if k in METRICS and v is not None))
+    return {'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                            'machine': platform.machine(), 'processor': platform.processor(),
+                            'cpus': os.cpu_count(), 'date': time.strftime('%Y-%m-%d %H:%M:%S')},
+            'settings': {'seed': Seed, 'repeats': Repeats, 'matrix_dtype': Matrix_dtype,
+                         'ts_calls': TS_Calls, 'ts_params': list(TS_Params), 'ts_kwargs': TS_Kwargs,
+                         'gls_calls': GLS_Calls, 'gls_params': list(GLS_Params),
+                         'gls_kwargs': GLS_Kwargs, 'memory_calls': Memory_Calls,
+                         'large_nodes': Large_Nodes, 'candidates': Candidates},
+            'instances': Results}
+
+def compare(Results, Baseline):
+    """
+    compare (function)
+        Input: Results of this run and of the baseline.
+        Output: List of regressions as text.
+        Description: A timing, throughput or peak memory regresses
+        when it is worse than the baseline by more than
+        Time_Tolerance (relative); a gap when it grows by more than
+        Gap_Tolerance. Instances or metrics missing on either side
+        are skipped.
+    """
+    Regressions = []
+    for Name, Base in Baseline['instances'].items():
+        New = Results['instances'].get(Name, {})
+        for Metric, Better in METRICS.items():
+            Old, Now = Base.get(Metric), New.get(Metric)
+            if Old is None or Now is None:
+                continue
+            if Metric.endswith('_gap'):
+                Worse = Now - Old > Gap_Tolerance
+            elif Better > 0:
+                Worse = Now < Old / (1 + Time_Tolerance)
+            else:
+                Worse = Now > Old * (1 + Time_Tolerance)
+            if Worse:
+                Regressions.append(f"{Name} {Metric}: {Old:.4g} -> {Now:.4g}")
+    return Regressions
+
+def write_json(file_path, Data):
+    """
+    write_json (function)
+        Input: File path and dictionary.
+        Description: Writes the results (the directory is created).
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w') as outfile:
+        json.dump(Data, outfile, indent=2)
+
+########## Procedure ##########
+
+if __name__ == '__main__':
+    Mode = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    if Mode not in ('run', 'baseline', 'compare'):
+        sys.exit(f"Unknown mode '{Mode}' (run, baseline or compare).")
+
+    Results = run_benchmarks()
+    write_json(Path_Baseline if Mode == 'baseline' else Path_Results, Results)
+
+    if Mode == 'compare':
+        with open(Path_Baseline, 'r') as infile:
+            Regressions = compare(Results, json.load(infile))
+        for Regression in Regressions:
+            print(f"REGRESSION {Regression}")
+        print(f"{len(Regressions)} regressions against {Path_Baseline}.")
+        sys.exit(1 if Regressions else 0)
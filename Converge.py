@@ -2,12 +2,15 @@
 import sys
 import os
 import json
-import csv
 
 ########## Globals ##########
 """
     Path_Instances 
         Path of TSP instances in your
+    Path_Cache
+        Directory of the cached distance matrices.
+    Matrix_dtype
+        Distance matrix type (TSPLIB rounded distances).
     max_calls_obj_func (global variable)
         Minimum of calls for end parametrization.
     obj_func_calls (global variable)
@@ -17,16 +20,19 @@ import csv
 Path_Instances = "Instances/Experimental"
 Path_Params = 'Results/Parameters/best_TS_params.txt'
 Path_OPT = "Optimals/Experimental/Optimals.txt"
+Path_Cache = "Cache"
+Matrix_dtype = "int32"
 output_directory = 'Results/Experimentals'
 
 ########## Own files ##########
 # Path from the workspace.
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Libraries'))
 from ReadTSP import ReadTsp # type: ignore
-from ReadTSP import ReadTSP_optTour # type: ignore
+from ReadTSP import ReadOptimals, InstanceName # type: ignore
 from TabuSearch import ObjFun  # type: ignore
 from TabuSearch import TabuSearch  # type: ignore
 from GLS import Guided_Local_Search # type: ignore
+from Trace import CsvTrace # type: ignore
 
 ########## Secundary functions ##########
 
@@ -44,9 +50,11 @@ def Read_Content(filenames_Ins, filenames_Opt):
 
     # Reading files.
     for file in filenames_Ins:
-        Instances.append(ReadTsp(file))
+        Instances.append(ReadTsp(file, Path_Cache, Matrix_dtype))
 
-    OPT_Instances = ReadTSP_optTour(filenames_Opt)
+    # Optimal value of each instance, looked up by its name.
+    Optimals = ReadOptimals(filenames_Opt)
+    OPT_Instances = [Optimals[InstanceName(file)] for file in filenames_Ins]
 
     return Instances, OPT_Instances
 
@@ -92,7 +100,7 @@ def normalized_error(opt_value, found_value):
 ########## Procedure ##########
 
 # Obtain TSP's instances.
-Content_Instances = os.listdir(Path_Instances)
+Content_Instances = sorted(os.listdir(Path_Instances))
 files_Instances = []
 for file in Content_Instances:
     if(os.path.isfile(os.path.join(Path_Instances,file))):
@@ -107,21 +115,12 @@ best_params = load_best_params(Path_Params)
 results_file_path = os.path.join(output_directory, 'GLS_converge_38.csv')
 
 # Using best parameters to obtain solutions.
-n = len(Instances)
-results = []
-BestNeOf, BestSolOf = TabuSearch(Instances[0], len(Instances[0]), 
-                    80000,
-                    best_params['TabuSize'],
-                    best_params['ErrorTolerance'])
-
-for i in range(len(BestNeOf)):
-    BestNeOf[i] = (BestNeOf[i]-Opt_Instances[0])/(Opt_Instances[0])
-    BestSolOf[i] = (BestSolOf[i]-Opt_Instances[0])/(Opt_Instances[0])
-
+# The convergence (normalized errors) is written while the run goes on.
 with open(results_file_path, mode='w', newline='') as csvfile:
-    csv_writer = csv.writer(csvfile)
-    # Escribir encabezados
-    csv_writer.writerow(['Mejor', 'Vecinos'])
-    # Escribir datos
-    for best_sol, best_ne in zip(BestSolOf, BestNeOf):
-        csv_writer.writerow([best_sol, best_ne])
+    Trace = CsvTrace(csvfile, Optimal=Opt_Instances[0])
+    TabuSearch(Instances[0], len(Instances[0]),
+               80000,
+               best_params['TabuSize'],
+               best_params['ErrorTolerance'],
+               Trace=Trace)
+    Trace.close()
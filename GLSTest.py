@@ -9,6 +9,31 @@ import json
 """
     Path_Instances 
         Path of TSP instances in your
+    Path_Cache
+        Directory of the cached distance matrices.
+    Matrix_dtype
+        Distance matrix type (TSPLIB rounded distances).
+    Repetitions, Seed, Workers
+        Independent runs, base seed of their random streams
+        and worker processes (None uses every core).
+    TimeLimit
+        Seconds per run (None: only the calls budget). Runs also
+        stop once they reach the optimal value.
+    Path_Checkpoints
+        Directory where each repetition saves its state and
+        resumes from (None disables checkpoints).
+    InitialStrategy
+        Construction of the first tour (see Construction.py:
+        'random', 'nearest_neighbor', 'greedy', 'hilbert', 'mst'
+        or 'insertion').
+    Instrument
+        Print the evaluation counts, rates (moves/s, evaluations/s)
+        and time per section of every run (Instrumentation.py).
+    FastLocalSearch
+        Each GLS iteration descends to a local optimum scanning
+        only the cities activated by the last penalties (opt-in;
+        False keeps the one 2-opt move per iteration of the
+        original GLS).
     max_calls_obj_func (global variable)
         Minimum of calls for end parametrization.
     obj_func_calls (global variable)
@@ -18,16 +43,28 @@ import json
 Path_Instances = "Instances/Experimental"
 Path_Params = 'Results/Parameters/best_GLS_params.txt'
 Path_OPT = "Optimals/Experimental/Optimals.txt"
+Path_Cache = "Cache"
+Matrix_dtype = "int32"
+Repetitions = 11
+Seed = 2024
+Workers = None
+TimeLimit = None
+Path_Checkpoints = None
+InitialStrategy = 'insertion'
+Instrument = False
+FastLocalSearch = False
 output_directory = 'Results/Experimentals'
 
 ########## Own files ##########
 # Path from the workspace.
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Libraries'))
 from ReadTSP import ReadTsp # type: ignore
-from ReadTSP import ReadTSP_optTour # type: ignore
+from ReadTSP import ReadOptimals, InstanceName # type: ignore
 from TabuSearch import ObjFun  # type: ignore
 from TabuSearch import TabuSearch  # type: ignore
 from GLS import Guided_Local_Search # type: ignore
+from Parallel import run_repetitions # type: ignore
+from Instrumentation import format_report # type: ignore
 
 ########## Secundary functions ##########
 
@@ -45,9 +82,11 @@ def Read_Content(filenames_Ins, filenames_Opt):
 
     # Reading files.
     for file in filenames_Ins:
-        Instances.append(ReadTsp(file))
+        Instances.append(ReadTsp(file, Path_Cache, Matrix_dtype))
 
-    OPT_Instances = ReadTSP_optTour(filenames_Opt)
+    # Optimal value of each instance, looked up by its name.
+    Optimals = ReadOptimals(filenames_Opt)
+    OPT_Instances = [Optimals[InstanceName(file)] for file in filenames_Ins]
 
     return Instances, OPT_Instances
 
@@ -77,43 +116,50 @@ def write_results(file_path, results):
 
 ########## Procedure ##########
 
-# Obtain TSP's instances.
-Content_Instances = os.listdir(Path_Instances)
-files_Instances = []
-for file in Content_Instances:
-    if(os.path.isfile(os.path.join(Path_Instances,file))):
-        files_Instances.append(Path_Instances+"/"+file)
-
-# Obtain TSP Instances and optimal tour
-# corresponding to each one.
-Instances, Opt_Instances = Read_Content(files_Instances, Path_OPT)
-
-# Params.
-best_params = load_best_params(Path_Params)
-results_file_path = os.path.join(output_directory, 'GLS_results_194_1.txt')
-
-# Using best parameters to obtain solutions.
-n = len(Instances)
-results = []
-#for Instance, opt_value in zip(Instances, Opt_Instances):
-for i in range(11):
-        # Llamar a GLS (o TabuSearch) utilizando los mejores parámetros cargados.
-        _ , result = Guided_Local_Search(Instances[2], len(Instances[2]), 
-                     300000,
-                     best_params["alpha"])
-        
+if __name__ == '__main__':
+    # Obtain TSP's instances.
+    Content_Instances = sorted(os.listdir(Path_Instances))
+    files_Instances = []
+    for file in Content_Instances:
+        if(os.path.isfile(os.path.join(Path_Instances,file))):
+            files_Instances.append(Path_Instances+"/"+file)
+
+    # Obtain TSP Instances and optimal tour
+    # corresponding to each one.
+    Instances, Opt_Instances = Read_Content(files_Instances, Path_OPT)
+
+    # Params.
+    best_params = load_best_params(Path_Params)
+    results_file_path = os.path.join(output_directory, 'GLS_results_194_1.txt')
+
+    # Using best parameters to obtain solutions.
+    n = len(Instances)
+    results = []
+    # Llamar a GLS en paralelo utilizando los mejores parámetros cargados.
+    Runs = run_repetitions(Guided_Local_Search, [Instances[2]], Repetitions,
+                           (300000, best_params["alpha"]),
+                           {'TimeLimit': TimeLimit, 'Optimal': Opt_Instances[2],
+                            'FastLocalSearch': FastLocalSearch, 'InitialStrategy': InitialStrategy},
+                           Seed=Seed, Workers=Workers, Checkpoints=Path_Checkpoints,
+                           Instrument=Instrument)[0]
+    if Instrument:
+        Runs, Reports = zip(*Runs)
+        for r, Report in enumerate(Reports):
+            print(f"Run {r}: {format_report(Report)}")
+
+    # Resultados en el mismo orden que las repeticiones.
+    for _ , result in Runs:
         # Calcular el valor de la función objetivo para la solución obtenida
-        #obj_value = ObjFun(result, Instances[2])
         obj_value = min(result)
 
         # Calcular el error respecto al valor óptimo
         error = (obj_value - Opt_Instances[2]) / Opt_Instances[2]
-        
+
         # Guardar el resultado y el error
         results.append((obj_value, error))
-        
+
         # Imprimir el valor de la función objetivo para la solución obtenida.
         print(f"Objective Value: {obj_value}, Error: {error}")
 
-# Escribir los resultados en un archivo
-write_results(results_file_path, results)
\ No newline at end of file
+    # Escribir los resultados en un archivo
+    write_results(results_file_path, results)
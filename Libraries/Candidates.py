@@ -0,0 +1,141 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+from Tour import tour_positions
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy is optional
+    cKDTree = None
+
+########## Functions candidate lists ##########
+
+def nearest_neighbors(Coordinates, k, ChunkSize=None):
+    """
+    nearest_neighbors (function)
+        Input: Array (n x 2) with the coordenates, number k of
+        neighbors and number of rows computed at once (by
+        default about 2**22 distances per block).
+        Output: Array (n x k) with the k nearest cities of each
+        city (0-based), closest first.
+        Description: Candidate lists from the coordenates. Uses a
+        KD-tree when scipy is available and blocks of Euclidean
+        distances otherwise.
+    """
+    Coordinates = np.asarray(Coordinates, dtype=float)
+    n = len(Coordinates)
+    k = min(k, n - 1)
+    ChunkSize = ChunkSize or max(1, 2**22 // n)
+
+    if cKDTree is not None:
+        _, Neighbors = cKDTree(Coordinates).query(Coordinates, k + 1)
+        return _drop_self(Neighbors, k)
+
+    Neighbors = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, ChunkSize):
+        stop = min(start + ChunkSize, n)
+        Diff = Coordinates[start:stop, None, :] - Coordinates[None, :, :]
+        Neighbors[start:stop] = _k_smallest(np.einsum('ijk,ijk->ij', Diff, Diff), start, k)
+    return Neighbors
+
+def candidates_from_matrix(DistanceMatrix, k, ChunkSize=None):
+    """
+    candidates_from_matrix (function)
+        Input: Distance matrix, number k of neighbors and number
+        of rows processed at once (by default about 2**22
+        distances per block).
+        Output: Array (n x k) with the k nearest cities of each
+        city (0-based), closest first.
+        Description: Candidate lists for instances without
+        coordenates (or with non Euclidean distances).
+    """
+    n = len(DistanceMatrix)
+    k = min(k, n - 1)
+    ChunkSize = ChunkSize or max(1, 2**22 // n)
+    Neighbors = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, ChunkSize):
+        stop = min(start + ChunkSize, n)
+        Rows = np.array(DistanceMatrix[start:stop], dtype=float)
+        Neighbors[start:stop] = _k_smallest(Rows, start, k)
+    return Neighbors
+
+def _k_smallest(Rows, start, k):
+    # Index of the k smallest entries of each row, skipping the city itself.
+    Rows[np.arange(len(Rows)), np.arange(start, start + len(Rows))] = np.inf
+    Part = np.argpartition(Rows, k - 1, axis=1)[:, :k]
+    Order = np.argsort(np.take_along_axis(Rows, Part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(Part, Order, axis=1)
+
+def _drop_self(Neighbors, k):
+    # The KD-tree returns the query point itself (usually first).
+    Self = Neighbors == np.arange(len(Neighbors))[:, None]
+    Self[~Self.any(axis=1), -1] = True
+    return Neighbors[~Self].reshape(len(Neighbors), k)
+
+def candidate_lists(Candidates, DistanceMatrix):
+    """
+    candidate_lists (function)
+        Input: None, a number k or an (n x k) array, and the
+        distance matrix.
+        Output: None or (n x k) array of candidate lists.
+        Description: Lets the solvers take either the size of
+        the lists or lists built beforehand (e.g. with
+        nearest_neighbors from the coordenates).
+    """
+    if Candidates is None:
+        return None
+    if np.isscalar(Candidates):
+        # A DistanceOracle carries its coordenates.
+        if hasattr(DistanceMatrix, 'Coordinates'):
+            return nearest_neighbors(DistanceMatrix.Coordinates, int(Candidates))
+        return candidates_from_matrix(DistanceMatrix, int(Candidates))
+    return np.asarray(Candidates)
+
+# Size of the candidate lists of a solver run without Candidates: the 2-opt
+# neighborhood on a DistanceOracle and the local search descent.
+ORACLE_CANDIDATES = 8
+
+def solver_candidates(Candidates, DistanceMatrix):
+    """
+    solver_candidates (function)
+        Input: Candidates argument of a solver (None, a number k or
+        an (n x k) array) and the distance matrix.
+        Output: None (full 2-opt neighborhood) or candidate lists.
+        Description: As candidate_lists, but a DistanceOracle (any
+        matrix that is not an ndarray) never gets the full
+        neighborhood: O(n^2) moves per iteration, each one computed
+        by the oracle, is what it is meant to avoid. Without
+        Candidates it gets ORACLE_CANDIDATES nearest neighbors.
+    """
+    if Candidates is None and not isinstance(DistanceMatrix, np.ndarray):
+        Candidates = ORACLE_CANDIDATES
+    return candidate_lists(Candidates, DistanceMatrix)
+
+def candidate_moves(Solution, Candidates):
+    """
+    candidate_moves (function)
+        Input: Solution and candidate lists (n x k, 0-based).
+        Output: Index vectors I and J of the restricted 2-opt
+        neighborhood.
+        Description: Only the moves (i, j), i + 2 <= j < i + n - 2
+        (the longer reversals leave the same cycle), where one of
+        the new edges joins a city with one of its candidates.
+        Moves come in the same order as in two_opt_moves and
+        there are O(n k) of them.
+    """
+    n = len(Solution)
+    Pos = tour_positions(Solution)
+
+    # Position p of each city and q of each of its candidates.
+    P = np.repeat(Pos, Candidates.shape[1])
+    Q = Pos[Candidates.ravel()]
+
+    # The new edge is (s[i-1], s[j]) or (s[i], s[j+1]), in both orientations.
+    I = np.concatenate(((P + 1) % n, (Q + 1) % n, P, Q))
+    J = np.concatenate((Q, P, (Q - 1) % n, (P - 1) % n))
+    Valid = (J - I >= 2) & (J - I < n - 2)
+
+    Keys = np.unique(I[Valid].astype(np.int64) * n + J[Valid])
+    return Keys // n, Keys % n
@@ -0,0 +1,86 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+import json
+sys.path.append(os.path.dirname(__file__))
+from SparseEdges import SparseEdgeMatrix
+
+########## Functions checkpoint ##########
+
+def save_checkpoint(Path, State):
+    """
+    save_checkpoint (function)
+        Input: File path and dictionary of arrays (see pack_*).
+        Output: None.
+        Description: Compressed .npz written to a temporary file
+        and renamed over Path, so an interrupted write never
+        leaves a broken checkpoint.
+    """
+    TmpPath = f"{Path}.{os.getpid()}.tmp"
+    with open(TmpPath, 'wb') as outfile:
+        np.savez_compressed(outfile, **State)
+    os.replace(TmpPath, Path)
+
+def load_checkpoint(Path):
+    """
+    load_checkpoint (function)
+        Input: File path.
+        Output: Dictionary of arrays, or None if there is no file.
+    """
+    if not os.path.exists(Path):
+        return None
+    with np.load(Path, allow_pickle=False) as Data:
+        return {Key: Data[Key] for Key in Data.files}
+
+def pack_rng(rng):
+    """
+    pack_rng (function)
+        Input: Random generator (np.random.Generator, or None for
+        the global np.random).
+        Output: Dictionary of arrays with its state.
+    """
+    if rng is None:
+        Name, Keys, Pos, HasGauss, Gauss = np.random.get_state()
+        return {'rng_keys': Keys,
+                'rng_legacy': np.array(json.dumps([Name, int(Pos), int(HasGauss), float(Gauss)]))}
+    return {'rng_state': np.array(json.dumps(rng.bit_generator.state))}
+
+def unpack_rng(rng, State):
+    """
+    unpack_rng (function)
+        Input: Random generator (None for the global np.random)
+        and checkpoint.
+        Description: Restores the state saved by pack_rng.
+    """
+    if rng is None:
+        Name, Pos, HasGauss, Gauss = json.loads(str(State['rng_legacy']))
+        np.random.set_state((Name, State['rng_keys'], Pos, HasGauss, Gauss))
+    else:
+        rng.bit_generator.state = json.loads(str(State['rng_state']))
+
+def pack_matrix(Name, Matrix):
+    """
+    pack_matrix (function)
+        Input: Name and matrix (dense or SparseEdgeMatrix).
+        Output: Dictionary of arrays with its content.
+    """
+    if isinstance(Matrix, SparseEdgeMatrix):
+        return {Name + '_keys': Matrix.keys, Name + '_values': Matrix.values}
+    return {Name: np.asarray(Matrix)}
+
+def unpack_matrix(Name, Matrix, State):
+    """
+    unpack_matrix (function)
+        Input: Name, matrix to restore and checkpoint.
+        Output: Restored matrix: the same object, or a new array
+        when the saved one had been widened to another dtype.
+    """
+    if isinstance(Matrix, SparseEdgeMatrix):
+        Matrix.keys = State[Name + '_keys'].copy()
+        Matrix.values = State[Name + '_values'].copy()
+    elif Matrix.dtype != State[Name].dtype:
+        return State[Name].copy()
+    else:
+        Matrix[...] = State[Name]
+    return Matrix
@@ -0,0 +1,267 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+from Candidates import candidate_lists
+
+########## Functions construction ##########
+
+def _row(DistanceMatrix, c):
+    # Distances from city c (0-based) as a float vector (also for a DistanceOracle).
+    return np.array(DistanceMatrix[c], dtype=float)
+
+def _solution(Order):
+    # 0-based tour order -> permutation vector (1-based).
+    return np.asarray(Order, dtype=np.int64) + 1
+
+def random_tour(DistanceMatrix, rng=None):
+    """
+    random_tour (function)
+        Input: Distance matrix and random generator (global
+        np.random if None).
+        Output: Random permutation vector (as first_solution).
+    """
+    return (rng or np.random).permutation(np.arange(1, len(DistanceMatrix) + 1))
+
+def nearest_neighbor(DistanceMatrix, Start=None, rng=None):
+    """
+    nearest_neighbor (function)
+        Input: Distance matrix (or oracle), first city (0-based;
+        drawn with rng if None) and random generator.
+        Output: Permutation vector.
+        Description: From the last city, always go to the closest
+        unvisited one. Each step is one vectorized row scan, O(n^2)
+        in total. A random start gives a different tour per call.
+    """
+    n = len(DistanceMatrix)
+    if Start is None:
+        Start = int(np.random.randint(n) if rng is None else rng.integers(n))
+    Visited = np.zeros(n, dtype=bool)
+    Order = np.empty(n, dtype=np.int64)
+    c = Start
+    for k in range(n):
+        Order[k] = c
+        Visited[c] = True
+        if k < n - 1:
+            Row = _row(DistanceMatrix, c)
+            Row[Visited] = np.inf
+            c = int(np.argmin(Row))
+    return _solution(Order)
+
+def greedy_edge(DistanceMatrix, Candidates=10):
+    """
+    greedy_edge (function)
+        Input: Distance matrix (or oracle) and candidate lists
+        (number k or n x k array).
+        Output: Permutation vector.
+        Description: Greedy matching: the candidate edges are
+        sorted once by length and taken while both endpoints have
+        degree < 2 and no cycle is closed (union-find). The
+        fragments left are joined by nearest endpoint.
+    """
+    n = len(DistanceMatrix)
+    Lists = candidate_lists(Candidates, DistanceMatrix)
+    A = np.repeat(np.arange(n), Lists.shape[1])
+    B = Lists.ravel()
+    # Every undirected edge once, shortest first.
+    A, B = np.minimum(A, B), np.maximum(A, B)
+    Keep = A != B
+    A, B = np.unique(np.stack((A[Keep], B[Keep])), axis=1)
+    Order = np.argsort(DistanceMatrix[A, B], kind='stable')
+
+    Parent = list(range(n))
+    def find(x):
+        while Parent[x] != x:
+            Parent[x] = Parent[Parent[x]]
+            x = Parent[x]
+        return x
+
+    Degree = [0] * n
+    Adjacent = [[] for _ in range(n)]
+    Taken = 0
+    for a, b in zip(A[Order].tolist(), B[Order].tolist()):
+        if Degree[a] == 2 or Degree[b] == 2:
+            continue
+        ra, rb = find(a), find(b)
+        if ra == rb:
+            continue
+        Parent[ra] = rb
+        Degree[a] += 1
+        Degree[b] += 1
+        Adjacent[a].append(b)
+        Adjacent[b].append(a)
+        Taken += 1
+        if Taken == n - 1:
+            break
+
+    # Fragments (paths) from their endpoints; isolated cities are paths of one.
+    Paths = []
+    Seen = np.zeros(n, dtype=bool)
+    for c in range(n):
+        if Seen[c] or Degree[c] == 2:
+            continue
+        Path = [c]
+        Seen[c] = True
+        Prev, Cur = -1, c
+        while True:
+            Next = [x for x in Adjacent[Cur] if x != Prev]
+            if not Next:
+                break
+            Prev, Cur = Cur, Next[0]
+            Path.append(Cur)
+            Seen[Cur] = True
+        Paths.append(Path)
+    return _solution(_join_paths(DistanceMatrix, Paths))
+
+def _join_paths(DistanceMatrix, Paths):
+    # Chains the paths: from the tail, go to the nearest free endpoint.
+    Heads = np.array([Path[0] for Path in Paths])
+    Tails = np.array([Path[-1] for Path in Paths])
+    Free = np.ones(len(Paths), dtype=bool)
+    Free[0] = False
+    Order = list(Paths[0])
+    for _ in range(len(Paths) - 1):
+        Left = np.flatnonzero(Free)
+        ToHead = DistanceMatrix[Order[-1], Heads[Left]]
+        ToTail = DistanceMatrix[Order[-1], Tails[Left]]
+        k = int(np.argmin(np.minimum(ToHead, ToTail)))
+        p = int(Left[k])
+        Order.extend(Paths[p] if ToHead[k] <= ToTail[k] else Paths[p][::-1])
+        Free[p] = False
+    return Order
+
+def hilbert_curve(Coordinates, Order=16):
+    """
+    hilbert_curve (function)
+        Input: Array (n x 2) with the coordenates and number of
+        bits per axis of the grid.
+        Output: Permutation vector.
+        Description: Space-filling curve heuristic: the cities are
+        visited in the order of their index on a Hilbert curve
+        over the bounding box, O(n log n) and without distances.
+    """
+    Coordinates = np.asarray(Coordinates, dtype=float)
+    Low = Coordinates.min(axis=0)
+    Side = max(float(np.ptp(Coordinates, axis=0).max()), 1e-12)
+    Cells = (1 << Order) - 1
+    X, Y = (np.floor((Coordinates - Low) / Side * Cells).astype(np.int64)).T
+    Index = np.zeros(len(Coordinates), dtype=np.int64)
+    s = 1 << (Order - 1)
+    while s > 0:
+        rx = (X & s) > 0
+        ry = (Y & s) > 0
+        Index += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant.
+        Flip = ~ry & rx
+        X = np.where(Flip, Cells - X, X)
+        Y = np.where(Flip, Cells - Y, Y)
+        X, Y = np.where(ry, X, Y), np.where(ry, Y, X)
+        s >>= 1
+    return _solution(np.argsort(Index, kind='stable'))
+
+def mst_tour(DistanceMatrix, Start=0):
+    """
+    mst_tour (function)
+        Input: Distance matrix (or oracle) and root city (0-based).
+        Output: Permutation vector.
+        Description: Double-tree heuristic (Christofides without
+        the matching): minimum spanning tree by Prim with one
+        vectorized row update per city, then the preorder walk of
+        the tree, nearest children first. At most twice the
+        optimum on metric instances.
+    """
+    n = len(DistanceMatrix)
+    InTree = np.zeros(n, dtype=bool)
+    Key = np.full(n, np.inf)
+    Parent = np.full(n, -1)
+    Key[Start] = 0
+    Children = [[] for _ in range(n)]
+    for _ in range(n):
+        c = int(np.argmin(np.where(InTree, np.inf, Key)))
+        InTree[c] = True
+        if Parent[c] >= 0:
+            Children[Parent[c]].append(c)
+        Row = _row(DistanceMatrix, c)
+        Better = ~InTree & (Row < Key)
+        Key[Better] = Row[Better]
+        Parent[Better] = c
+
+    Order = []
+    Stack = [Start]
+    while Stack:
+        c = Stack.pop()
+        Order.append(c)
+        Stack.extend(sorted(Children[c], key=lambda x: Key[x], reverse=True))
+    return _solution(Order)
+
+def farthest_insertion(DistanceMatrix, Start=0):
+    """
+    farthest_insertion (function)
+        Input: Distance matrix (or oracle) and first city (0-based).
+        Output: Permutation vector.
+        Description: The city farthest from the partial tour is
+        inserted where it increases the length the least. Both
+        choices are vectorized, O(n^2) in total.
+    """
+    n = len(DistanceMatrix)
+    Order = np.array([Start], dtype=np.int64)
+    InTour = np.zeros(n, dtype=bool)
+    InTour[Start] = True
+    ToTour = _row(DistanceMatrix, Start)
+    for _ in range(n - 1):
+        c = int(np.argmax(np.where(InTour, -np.inf, ToTour)))
+        Next = np.roll(Order, -1)
+        Row = _row(DistanceMatrix, c)
+        Increase = Row[Order] + Row[Next] - np.asarray(DistanceMatrix[Order, Next], dtype=float)
+        Order = np.insert(Order, int(np.argmin(Increase)) + 1, c)
+        InTour[c] = True
+        ToTour = np.minimum(ToTour, Row)
+    return _solution(Order)
+
+# Strategies by name; the values build one tour from (DistanceMatrix, rng).
+STRATEGIES = {
+    'random': random_tour,
+    'nearest_neighbor': lambda D, rng=None: nearest_neighbor(D, rng=rng),
+    'greedy': lambda D, rng=None: greedy_edge(D),
+    'hilbert': lambda D, rng=None: hilbert_curve(_coordinates(D)),
+    'mst': lambda D, rng=None: mst_tour(D),
+    'insertion': lambda D, rng=None: farthest_insertion(D),
+}
+
+# Strategies that give a different tour on every call.
+RANDOMIZED = ('random', 'nearest_neighbor')
+
+def _coordinates(DistanceMatrix):
+    if not hasattr(DistanceMatrix, 'Coordinates'):
+        raise ValueError("The 'hilbert' strategy needs coordenates (a DistanceOracle); "
+                         "pass hilbert_curve(Coordinates) as InitialSolution instead.")
+    return DistanceMatrix.Coordinates
+
+def initial_solution(Strategy, DistanceMatrix, rng=None):
+    """
+    initial_solution (function)
+        Input: Strategy (a name of STRATEGIES or a function of
+        (DistanceMatrix, rng)), distance matrix and random
+        generator.
+        Output: Permutation vector.
+    """
+    if callable(Strategy):
+        return np.asarray(Strategy(DistanceMatrix, rng))
+    if Strategy not in STRATEGIES:
+        raise ValueError(f"Unknown initial strategy '{Strategy}' "
+                         f"(one of {', '.join(STRATEGIES)}).")
+    return STRATEGIES[Strategy](DistanceMatrix, rng)
+
+def restart_solution(Strategy, DistanceMatrix, rng=None):
+    """
+    restart_solution (function)
+        Input: Strategy, distance matrix and random generator.
+        Output: Permutation vector for a diversification restart.
+        Description: The strategy itself when it is randomized;
+        the deterministic ones would rebuild the same tour, so
+        they restart from a random permutation.
+    """
+    if callable(Strategy) or Strategy in RANDOMIZED:
+        return initial_solution(Strategy, DistanceMatrix, rng)
+    return random_tour(DistanceMatrix, rng)
@@ -0,0 +1,204 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+from math import ceil, isqrt
+sys.path.append(os.path.dirname(__file__))
+from ReadTSP import CoordinateDistanceMatrix, NodeDistances
+from Candidates import nearest_neighbors
+from Construction import farthest_insertion
+from LocalSearch import local_search
+from Parallel import run_tasks, task_seeds
+from TabuSearch import ObjFun, TabuSearch
+
+########## Functions partition ##########
+
+def kmeans(Coordinates, AmountClusters, rng=None, Iterations=10):
+    """
+    kmeans (function)
+        Input: Array (n x 2) with the coordenates, number of
+        clusters, random generator and number of Lloyd iterations.
+        Output: Label (0..k-1) of every city.
+        Description: Lloyd's algorithm from k random cities. The
+        assignment is computed by blocks of cities (about 2**22
+        distances each) and the centroids with bincount. Empty
+        clusters are dropped.
+    """
+    Coordinates = np.asarray(Coordinates, dtype=float)
+    n = len(Coordinates)
+    rng = rng or np.random.default_rng()
+    Centroids = Coordinates[rng.choice(n, AmountClusters, replace=False)]
+    ChunkSize = max(1, 2**22 // AmountClusters)
+    Labels = np.zeros(n, dtype=np.int64)
+    for _ in range(Iterations):
+        for start in range(0, n, ChunkSize):
+            Diff = Coordinates[start:start + ChunkSize, None, :] - Centroids[None, :, :]
+            Labels[start:start + ChunkSize] = np.argmin(np.einsum('ijk,ijk->ij', Diff, Diff), axis=1)
+        Counts = np.bincount(Labels, minlength=len(Centroids))
+        Full = Counts > 0
+        Sums = np.stack([np.bincount(Labels, Coordinates[:, d], len(Centroids)) for d in (0, 1)],
+                        axis=1)
+        Centroids[Full] = Sums[Full] / Counts[Full, None]
+    return np.unique(Labels, return_inverse=True)[1]
+
+def grid_partition(Coordinates, ClusterSize):
+    """
+    grid_partition (function)
+        Input: Array (n x 2) with the coordenates and number of
+        cities per cluster.
+        Output: Label of every city.
+        Description: Balanced grid: about sqrt(n / ClusterSize)
+        vertical strips with the same number of cities, each one
+        cut along y into cells of ClusterSize cities.
+    """
+    Coordinates = np.asarray(Coordinates, dtype=float)
+    n = len(Coordinates)
+    Strips = max(isqrt(ceil(n / ClusterSize)), 1)
+    Labels = np.empty(n, dtype=np.int64)
+    Next = 0
+    for Strip in np.array_split(np.argsort(Coordinates[:, 0], kind='stable'), Strips):
+        Strip = Strip[np.argsort(Coordinates[Strip, 1], kind='stable')]
+        Cells = max(round(len(Strip) / ClusterSize), 1)
+        for Cell in np.array_split(Strip, Cells):
+            Labels[Cell] = Next
+            Next += 1
+    return Labels
+
+def partition(Coordinates, ClusterSize=500, Method='kmeans', rng=None):
+    """
+    partition (function)
+        Input: Array (n x 2) with the coordenates, target number
+        of cities per cluster, 'kmeans' or 'grid' and random
+        generator (kmeans).
+        Output: Label of every city.
+        Description: k-means clusters bigger than twice ClusterSize
+        are cut again with the grid, so no sub-problem is much
+        larger than asked.
+    """
+    n = len(Coordinates)
+    if Method == 'grid':
+        return grid_partition(Coordinates, ClusterSize)
+    if Method != 'kmeans':
+        raise ValueError(f"Unknown partition method '{Method}' (kmeans or grid).")
+    Labels = kmeans(Coordinates, max(ceil(n / ClusterSize), 1), rng)
+    Next = Labels.max() + 1
+    for c in np.flatnonzero(np.bincount(Labels) > 2 * ClusterSize):
+        Members = np.flatnonzero(Labels == c)
+        Parts = grid_partition(Coordinates[Members], ClusterSize)
+        Labels[Members[Parts > 0]] = Next + Parts[Parts > 0] - 1
+        Next += Parts.max()
+    return Labels
+
+########## Functions sub-tours ##########
+
+def best_tour(DistanceMatrix, AmountNodes, *Args, Solver=TabuSearch, rng=None, **Kwargs):
+    """
+    best_tour (function)
+        Input: Distance matrix, number of nodes, arguments of
+        Solver, solver (TabuSearch, Guided_Local_Search or the
+        same signature), random generator and keyword arguments.
+        Output: Best solution (permutation vector) of the run.
+        Description: The solvers return costs; the best tour is
+        caught through their Callback. Clusters of fewer than five
+        cities (no 2-opt neighborhood) are built by insertion.
+    """
+    if AmountNodes < 5:
+        return farthest_insertion(DistanceMatrix)
+    Best = {}
+    def keep(calls, BestSolution, BestCost):
+        Best['Solution'] = np.array(BestSolution)
+        return False
+    Solver(DistanceMatrix, AmountNodes, *Args, rng=rng, Callback=keep, **Kwargs)
+    return Best['Solution']
+
+def stitch(Coordinates, Tours, Sequence, EdgeWeightType='EUC_2D'):
+    """
+    stitch (function)
+        Input: Array (n x 2) with the coordenates, closed sub-tour
+        of every cluster (0-based cities), order of the clusters
+        and EDGE_WEIGHT_TYPE.
+        Output: Global tour as a permutation vector.
+        Description: Every sub-tour is opened at one edge and
+        walked in one direction. In cluster order, the edge and
+        direction chosen are the ones that minimize the edge from
+        the previous exit, minus the removed edge, plus the
+        distance from the new exit to the next cluster centroid
+        (all candidates of a cluster at once).
+    """
+    Coordinates = np.asarray(Coordinates, dtype=float)
+    Centroids = np.array([Coordinates[Tour].mean(axis=0) for Tour in Tours])
+    def d(A, B):
+        return NodeDistances(A, B, EdgeWeightType)
+
+    Order = []
+    Previous = Centroids[Sequence[-1]]
+    for q, c in enumerate(Sequence):
+        Tour = np.asarray(Tours[c])
+        if len(Tour) == 1:
+            Order.append(Tour)
+            Previous = Coordinates[Tour[0]]
+            continue
+        Next = Centroids[Sequence[(q + 1) % len(Sequence)]]
+        P, Q = Coordinates[Tour], Coordinates[np.roll(Tour, 1)]  # edge (Q[p], P[p])
+        Removed = d(P, Q)
+        Forward = d(Previous, P) + d(Q, Next) - Removed    # enter at P[p], leave at Q[p]
+        Backward = d(Previous, Q) + d(P, Next) - Removed   # enter at Q[p], leave at P[p]
+        p = int(np.argmin(np.minimum(Forward, Backward)))
+        Walk = np.roll(Tour, -p)
+        if Backward[p] < Forward[p]:
+            Walk = Walk[::-1]
+        Order.append(Walk)
+        Previous = Coordinates[Walk[-1]]
+    return np.concatenate(Order).astype(np.int64) + 1
+
+def solve_by_clusters(Oracle, Solver=TabuSearch, Args=(), Kwargs=None, ClusterSize=500,
+                      Method='kmeans', Seed=None, Workers=None, Candidates=8):
+    """
+    solve_by_clusters (function)
+        Input: DistanceOracle of the instance (ReadTspOracle),
+        solver and its positional and keyword arguments after
+        (DistanceMatrix, AmountNodes), target cities per cluster,
+        partition method ('kmeans' or 'grid'), base seed, number
+        of worker processes (None for all cores) and size of the
+        candidate lists of the final local search.
+        Output: Tour (permutation vector) and its cost.
+        Description: Decomposition for very large instances. The
+        cities are partitioned from their coordenates, the sub-TSP
+        of every cluster (its own small dense matrix) is solved in
+        parallel with run_tasks, the clusters are visited in the
+        order of an insertion tour over their centroids, the
+        sub-tours are stitched, and a 2-opt/Or-opt local search
+        over the whole tour, started from the cities on the cluster
+        borders, repairs the seams. Work and memory grow linearly
+        with n for a fixed ClusterSize.
+    """
+    Coordinates = Oracle.Coordinates
+    Labels = partition(Coordinates, ClusterSize, Method, np.random.default_rng(Seed))
+    Clusters = [np.flatnonzero(Labels == c) for c in range(Labels.max() + 1)]
+    Matrices = [CoordinateDistanceMatrix(Coordinates[Members], Oracle.EdgeWeightType,
+                                         dtype=Oracle.Rounding) for Members in Clusters]
+
+    # Sub-TSPs in parallel (one task per cluster, biggest first).
+    Tasks = [(c, Args, dict(Kwargs or {}, Solver=Solver)) for c in range(len(Clusters))]
+    Seeds = task_seeds(Seed, len(Tasks))
+    Biggest = sorted(range(len(Tasks)), key=lambda c: -len(Clusters[c]))
+    Results = run_tasks(best_tour, Matrices, [Tasks[c] for c in Biggest],
+                        [Seeds[c] for c in Biggest], Workers)
+    Tours = [None] * len(Clusters)
+    for c, Solution in zip(Biggest, Results):
+        Tours[c] = Clusters[c][np.asarray(Solution) - 1]
+
+    # Order of the clusters and global tour.
+    Centroids = np.array([Coordinates[Members].mean(axis=0) for Members in Clusters])
+    Sequence = farthest_insertion(CoordinateDistanceMatrix(Centroids, Oracle.EdgeWeightType)) - 1
+    Solution = stitch(Coordinates, Tours, Sequence, Oracle.EdgeWeightType)
+
+    # Repair of the seams: the descent starts from the cities with a candidate
+    # in another cluster and the endpoints of the edges between clusters.
+    Lists = nearest_neighbors(Coordinates, Candidates)
+    Order = Solution - 1
+    Seams = Labels[Order] != Labels[np.roll(Order, -1)]
+    Active = (Labels[Lists] != Labels[:, None]).any(axis=1)
+    Active[Order[Seams]] = Active[np.roll(Order, -1)[Seams]] = True
+    Solution, _, _ = local_search(Solution, Oracle, Lists, np.flatnonzero(Active))
+    return Solution, ObjFun(Solution, Oracle)
@@ -3,103 +3,348 @@ import numpy as np
 import random
 import os
 import sys
-import copy
-sys.path.append(os.path.join(os.path.dirname(__file__), 'Libraries'))
+sys.path.append(os.path.dirname(__file__))
 from TabuSearch import (
     ObjFun,
-    first_solution
+    two_opt_moves,
+    two_opt_deltas,
+    apply_two_opt
 )
+from Candidates import (
+    candidate_lists,
+    solver_candidates,
+    candidate_moves,
+    ORACLE_CANDIDATES
+)
+from SparseEdges import SparseEdgeMatrix
+from LocalSearch import local_search
+from Construction import initial_solution
+from Instrumentation import Budget
+from Tour import Tour, tour_order
+from Stopping import StopCriteria
+from Trace import MemoryTrace, trace_result
+from Checkpoint import (
+    save_checkpoint,
+    load_checkpoint,
+    pack_rng,
+    unpack_rng,
+    pack_matrix,
+    unpack_matrix
+)
+
+class AugmentedCosts:
+    """
+    AugmentedCosts (class)
+        Input: Distance matrix (or oracle), penalty matrix and alpha.
+        Description: Augmented costs D[a, b] + alpha * penalties[a, b]
+        computed on demand, for instances where an n x n augmented
+        matrix does not fit in memory.
+    """
+    def __init__(self, DistanceMatrix, penalties, alpha):
+        self.DistanceMatrix = DistanceMatrix
+        self.penalties = penalties
+        self.alpha = alpha
+        self.dtype = np.dtype(float)
+        self.shape = (len(penalties), len(penalties))
+
+    def __len__(self):
+        return self.shape[0]
 
-def get_neighbors_2opt(Solution):
+    def __getitem__(self, key):
+        A, B = key
+        return self.DistanceMatrix[A, B] + self.alpha * self.penalties[A, B]
+
+def new_penalties(AmountNodes, Sparse=False):
+    """
+    new_penalties (function)
+        Input: Number of nodes and whether to use a sparse store.
+        Output: Penalty matrix (all zeros).
+        Description: Penalties are small counts: int16 dense
+        matrix (widened by update_penalties if one ever reaches
+        the int16 limit), or a sparse store that only holds the
+        penalized edges.
+    """
+    if Sparse:
+        return SparseEdgeMatrix(AmountNodes, np.int32)
+    return np.zeros((AmountNodes, AmountNodes), dtype=np.int16)
+
+def augmented_matrix(DistanceMatrix, penalties, alpha):
+    """
+    augmented_matrix (function)
+        Input: Distance matrix, penalty matrix and alpha.
+        Output: Augmented cost matrix D + alpha * penalties.
+        Description: Cost matrix of the augmented objective
+        function. It is kept up to date by update_penalties,
+        so it is only built once per run. For a DistanceOracle
+        the augmented costs are computed on demand.
+    """
+    if not isinstance(DistanceMatrix, np.ndarray):
+        return AugmentedCosts(DistanceMatrix, penalties, alpha)
+    return np.asarray(DistanceMatrix, dtype=float) + alpha * penalties
+
+def augmented_cost(Solution, Augmented):
+    """
+    augmented_cost (function)
+        Input: Solution and augmented costs.
+        Output: Value of the augmented objective function.
+    """
+    Tour = tour_order(Solution)
+    return np.sum(Augmented[Tour, np.roll(Tour, -1)])
+
+def get_neighbors_2opt(Solution, Augmented, Candidates=None):
     """
     Generar vecinos usando el método 2-opt.
+    Cada vecino se describe por su movimiento (i, j) y el cambio
+    en la función aumentada, calculado con los cuatro arcos que
+    cambian. Con listas de candidatos solo se generan los
+    movimientos que agregan un arco candidato.
     """
-    neighbors = []
-    n = len(Solution)
-    for i in range(n - 1):
-        for j in range(i + 2, n):  # Asegurar que hay al menos un nodo entre i y j
-            # Generar el vecino 2-opt
-            new_solution = np.copy(Solution)
-            new_solution[i:j+1] = np.flip(Solution[i:j+1])  # Revertir el segmento entre i y j
-            neighbors.append(new_solution)
-    return neighbors
+    if Candidates is None:
+        I, J = two_opt_moves(len(Solution))
+    else:
+        I, J = candidate_moves(Solution, Candidates)
+    return I, J, two_opt_deltas(Solution, Augmented, I, J)
 
-def best_neighbor(Neighborhood, alpha, DistanceMatrix, penalties):
+def best_neighbor(Solution, Neighborhood, Solution_f, DistanceMatrix):
     """
     Buscar el mejor vecino según la penalización.
+    Solution_f es el valor de Solution en la función aumentada,
+    que se lleva de forma incremental (no se recalcula el tour).
+    El movimiento se aplica sobre Solution en el mismo lugar si es
+    un Tour (ver apply_two_opt).
+    Devuelve el vecino, su valor en la función aumentada y el
+    cambio del costo real (DistanceMatrix), calculado con los
+    cuatro arcos del movimiento.
     """
-    Best = None
-    Best_f = float('inf')
+    I, J, Delta = Neighborhood
+    k = int(np.argmin(Delta))
 
-    for candidate in Neighborhood:
-        candidate_f = ObjFun(candidate, DistanceMatrix)
-        candidate_f_p = candidate_f
+    Change = two_opt_deltas(Solution, DistanceMatrix, I[k:k + 1], J[k:k + 1])[0]
+    Best = apply_two_opt(Solution, I[k], J[k])
+    Best_f = Solution_f + Delta[k]
+    return Best, Best_f, Change
 
-        # Agregar penalización a la función objetivo
-        for i in range(len(candidate) - 1):
-            candidate_f_p += alpha * penalties[candidate[i]-1, candidate[i + 1]-1]
+def update_penalties(Solution, DistanceMatrix, penalties, Augmented, alpha):
+    """
+    Penalizar los arcos de máxima utilidad de la solución.
+    La utilidad se calcula solo para los arcos del tour. Los arcos
+    se tratan como no dirigidos (incluye el arco de cierre) y la
+    matriz aumentada se actualiza en el mismo lugar. Todos los
+    arcos de máxima utilidad se actualizan a la vez (cada arco
+    aparece una sola vez en el tour). Devuelve las penalizaciones
+    (un arreglo más ancho si int16 ya no alcanza), las ciudades
+    extremo de los arcos penalizados y el aumento del valor de la
+    solución en la función aumentada (alpha por arco penalizado).
+    """
+    Tour = tour_order(Solution)
+    Next = np.roll(Tour, -1)
 
-        if candidate_f_p < Best_f:
-            Best = copy.deepcopy(candidate)
-            Best_f = copy.deepcopy(candidate_f_p)
+    # Calcular la utilidad de cada arco del tour
+    Current = penalties[Tour, Next]
+    utilities = DistanceMatrix[Tour, Next] / (1 + Current)
 
-    return Best, Best_f
+    # Arcos de utilidad máxima
+    Max = utilities == np.max(utilities)
+    A, B = Tour[Max], Next[Max]
 
+    # Actualizar las penalizaciones de ambos sentidos del arco
+    if isinstance(penalties, np.ndarray):
+        if Current.max() >= np.iinfo(penalties.dtype).max:
+            penalties = penalties.astype(np.int32)
+        penalties[A, B] += 1
+        penalties[B, A] = penalties[A, B]
+    else:
+        penalties.add(A, B, 1)
+        penalties[B, A] = penalties[A, B]
+    if isinstance(Augmented, np.ndarray):
+        Augmented[A, B] += alpha
+        Augmented[B, A] += alpha
+    return penalties, np.unique(np.concatenate((A, B))), alpha * len(A)
 
-def Guided_Local_Search(DistanceMatrix, AmountNodes, MaxOFcalls=100, alpha=0.2):
+def Guided_Local_Search(DistanceMatrix, AmountNodes, MaxOFcalls=100, alpha=0.2,
+                        Candidates=None, UseLocalSearch=False, FastLocalSearch=False, rng=None,
+                        InitialSolution=None, InitialStrategy='random', TimeLimit=None,
+                        Optimal=None, TargetGap=0.0, Callback=None, Trace=None, Checkpoint=None,
+                        CheckpointEvery=1000, Resume=False, Counter=None, Migration=None):
     """
     Implementación de Guided Local Search para TSP
+    Candidates restringe el vecindario 2-opt a arcos candidatos:
+    un número k de vecinos más cercanos o un arreglo (n x k).
+    Con un DistanceOracle el vecindario siempre se restringe (8
+    vecinos más cercanos si Candidates es None).
+    Con UseLocalSearch cada iteración baja hasta un óptimo local
+    de la función aumentada con el descenso 2-opt/Or-opt de
+    LocalSearch (sus evaluaciones cuentan como llamadas) en vez
+    de hacer un solo movimiento 2-opt.
+    FastLocalSearch (implica UseLocalSearch) es la Fast Local Search
+    de GLS: cada ciudad tiene un bit de activación, el descenso solo
+    revisa los movimientos de las ciudades activas y, tras cada
+    penalización, solo se reactivan los extremos de los arcos
+    penalizados (al inicio todas están activas). Como la función
+    aumentada solo cambia en esos arcos, cada iteración revisa unas
+    pocas ciudades en vez del tour completo: el Tour, los bits y
+    las listas de candidatos se conservan entre iteraciones y los
+    costos (real y aumentado) se actualizan con los cambios que
+    devuelve el descenso.
+    rng es el generador aleatorio de la corrida (np.random global
+    si es None).
+    InitialSolution es la solución inicial (vector de permutación,
+    Tour o TwoLevelTour, que se copia en el Tour que la búsqueda
+    cambia en el mismo lugar); si es None se construye con
+    InitialStrategy (ver Construction.py: 'random',
+    'nearest_neighbor', 'greedy', 'hilbert', 'mst', 'insertion').
+    La corrida también se detiene tras TimeLimit segundos, cuando la
+    brecha con un óptimo conocido (Optimal) llega a TargetGap, o
+    cuando Callback(calls, BestSolution, BestCost), llamado en cada
+    iteración con la mejor solución hasta el momento (y una vez más
+    al final), devuelve True.
+    Trace recibe (llamadas, mejor costo, costo del vecino) en cada
+    iteración (Trace.py; MemoryTrace si es None). Devuelve las
+    listas de costos de los vecinos y de los mejores (solo los
+    últimos valores con otros Trace).
+    Checkpoint es un archivo donde se guarda todo el estado de la
+    búsqueda (soluciones, costos, penalizaciones, llamadas, estado
+    del generador e historial) cada CheckpointEvery iteraciones y
+    al final; con Resume la corrida continúa desde él, bit a bit,
+    si existe (mismos argumentos; el límite de tiempo se reinicia).
+    Un Trace que escribe un archivo lo continúa si se crea con
+    Resume=True (CsvTrace, NdjsonTrace).
+    Counter es el Budget (Instrumentation.py) que cuenta las llamadas
+    (evaluaciones completas y delta por separado) y mide el tiempo de
+    cada sección si se crea con Timers=True.
+    Migration se llama en cada iteración como
+    Migration.exchange(BestSolution, BestCost); si devuelve un par
+    (solución, costo), ese tour pasa a ser la solución actual y la
+    mejor (modelo de islas, Islands.Exchange).
     """
     # Inicialización de la solución
-    BestSolution = first_solution(AmountNodes)
-    CurrentSolution = np.copy(BestSolution)
+    Stop = StopCriteria(TimeLimit, Optimal, TargetGap, Callback)
+    Candidates = solver_candidates(Candidates, DistanceMatrix)
+    UseLocalSearch = UseLocalSearch or FastLocalSearch
+    if UseLocalSearch:
+        # Listas de Python y bits de "no mirar" para toda la corrida
+        SearchCandidates = candidate_lists(
+            Candidates if Candidates is not None else ORACLE_CANDIDATES, DistanceMatrix).tolist()
+        DontLook = [True] * AmountNodes
+    if InitialSolution is None:
+        InitialSolution = initial_solution(InitialStrategy, DistanceMatrix, rng)
+    CurrentSolution = Tour(InitialSolution)  # Copia propia, cada movimiento la cambia en el lugar
+    BestSolution = CurrentSolution.copy()
 
-    # Matriz de penalizaciones
-    penalties = np.zeros((AmountNodes, AmountNodes))  # Penalización entre todas las ciudades
-    utilities = np.zeros((AmountNodes, AmountNodes))  # Utilidad de los pares de ciudades
-    
-    # Registro de resultados
-    bests_n = []  # Historial de costos de las mejores soluciones
-    best_sol = []  # Historial de las mejores soluciones
+    # Matriz de penalizaciones (dispersa si DistanceMatrix es un DistanceOracle)
+    penalties = new_penalties(AmountNodes, not isinstance(DistanceMatrix, np.ndarray))
+    Augmented = augmented_matrix(DistanceMatrix, penalties, alpha)  # Costos aumentados
+
+    # Registro de resultados (historial de los mejores costos y de los vecinos)
+    Trace = MemoryTrace() if Trace is None else Trace
+    BestNeighbor = None
+    ActiveCities = np.arange(AmountNodes)  # Bits de activación (Fast Local Search)
     
-    calls = 1  # Contador de llamadas a la función objetivo
+    Counter = Budget() if Counter is None else Counter  # Contador de llamadas
+    Counter.count_full()
+    BestCost = ObjFun(BestSolution, DistanceMatrix)
+    CurrentCost = BestCost  # Costo real de la solución actual
+    Current_f = augmented_cost(CurrentSolution, Augmented)  # Valor en la función aumentada
 
     # Regularización dinamica.
-    regularizacion = alpha * (ObjFun(BestSolution,DistanceMatrix) / AmountNodes)
+    regularizacion = alpha * (BestCost / AmountNodes)
+
+    def save():
+        State = {'current': np.asarray(CurrentSolution), 'best': np.asarray(BestSolution),
+                 'best_cost': BestCost, 'augmented_cost': Current_f,
+                 'counters': np.array([Counter.calls, Loops]), 'active': ActiveCities,
+                 'last_neighbor_cost': np.array([] if BestNeighbor is None else [BestNeighbor_cost])}
+        State.update(pack_rng(rng), **pack_matrix('penalties', penalties), **Counter.get_state())
+        if isinstance(Augmented, np.ndarray):
+            State.update(pack_matrix('augmented', Augmented))
+        if hasattr(Trace, 'get_state'):
+            State.update(Trace.get_state())
+        save_checkpoint(Checkpoint, State)
+
+    # Continuar una corrida guardada
+    Loops = 0
+    State = load_checkpoint(Checkpoint) if Resume and Checkpoint is not None else None
+    if State is not None:
+        CurrentSolution, BestSolution = Tour(State['current']), Tour(State['best'])
+        BestCost, Current_f = State['best_cost'][()], State['augmented_cost'][()]
+        _, Loops = (int(x) for x in State['counters'])
+        Counter.set_state(State)
+        ActiveCities = State['active']
+        CurrentCost = BestCost
+        if len(State['last_neighbor_cost']):
+            BestNeighbor, BestNeighbor_cost = CurrentSolution, State['last_neighbor_cost'][0]
+            CurrentCost = BestNeighbor_cost
+        unpack_rng(rng, State)
+        penalties = unpack_matrix('penalties', penalties, State)
+        if isinstance(Augmented, np.ndarray):
+            unpack_matrix('augmented', Augmented, State)
+        if hasattr(Trace, 'set_state'):
+            Trace.set_state(State)
 
-    while calls < MaxOFcalls:
-        # Generar vecinos usando 2-opt
-        Neighborhood = get_neighbors_2opt(CurrentSolution)
-        calls += len(Neighborhood)
+    while Counter.calls < MaxOFcalls and not Stop.stop(Counter.calls, BestSolution, BestCost):
+        if Checkpoint is not None and Loops and Loops % CheckpointEvery == 0:
+            with Counter.timer('bookkeeping'):
+                save()
+        Loops += 1
 
-        # Encontrar el mejor vecino usando penalización
-        BestNeighbor, BestNeighbor_f = best_neighbor(Neighborhood, alpha, DistanceMatrix, penalties)
+        # Adoptar un tour mejor de otra isla (se conservan las penalizaciones)
+        if Migration is not None:
+            Migrant = Migration.exchange(BestSolution, BestCost)
+            if Migrant is not None:
+                CurrentSolution, CurrentCost = Tour(Migrant[0]), Migrant[1]
+                BestSolution, BestCost = CurrentSolution.copy(), CurrentCost
+                Current_f = augmented_cost(CurrentSolution, Augmented)
+                ActiveCities = np.arange(AmountNodes)
+                Counter.count_full()
+
+        if UseLocalSearch:
+            # Óptimo local de la función aumentada (solo ciudades activas con FLS)
+            with Counter.timer('local_search'):
+                BestNeighbor, evaluations, Change, CostChange = local_search(
+                    CurrentSolution, Augmented, SearchCandidates,
+                    ActiveCities if FastLocalSearch else None,
+                    DontLook=DontLook, Tracked=DistanceMatrix)
+            BestNeighbor_f = Current_f + Change
+            Counter.count_delta(max(evaluations, 1))
+            Counter.count_iteration()
+        else:
+            # Generar vecinos usando 2-opt
+            with Counter.timer('neighborhood'):
+                Neighborhood = get_neighbors_2opt(CurrentSolution, Augmented, Candidates)
+            Counter.count_delta(len(Neighborhood[2]))
+
+            # Encontrar el mejor vecino usando penalización
+            with Counter.timer('selection'):
+                BestNeighbor, BestNeighbor_f, CostChange = best_neighbor(
+                    CurrentSolution, Neighborhood, Current_f, DistanceMatrix)
+            Counter.count_move()
 
         regularizacion = alpha * (BestNeighbor_f / AmountNodes)
 
         # Calcular la utilidad y actualizar las penalizaciones
-        max_utility = 0
-        for i in range(len(BestNeighbor) - 1):
-            pair_penalty = penalties[BestNeighbor[i]-1, BestNeighbor[i + 1]-1]
-            pair_distance = DistanceMatrix[BestNeighbor[i]-1, BestNeighbor[i + 1]-1]
-            utilities[BestNeighbor[i]-1, BestNeighbor[i + 1]-1] = pair_distance / (1 + pair_penalty)
-
-            # Encontrar la utilidad máxima
-            max_utility = max(max_utility, utilities[BestNeighbor[i]-1, BestNeighbor[i + 1]-1])
-
-        # Actualizar las penalizaciones basadas en la utilidad máxima
-        for i in range(len(BestNeighbor) - 1):
-            if utilities[BestNeighbor[i]-1, BestNeighbor[i + 1]-1] == max_utility:
-                penalties[BestNeighbor[i]-1, BestNeighbor[i + 1]-1] += 1 
-
-        # Actualizar la solución si se encuentra una mejora
-        if BestNeighbor_f < ObjFun(BestSolution, DistanceMatrix):
-            BestSolution = np.copy(BestNeighbor)
-        
-        CurrentSolution = BestNeighbor
-
-        # Registrar las mejores soluciones y costos
-        best_sol.append(ObjFun(BestSolution, DistanceMatrix))
-        bests_n.append(ObjFun(BestNeighbor, DistanceMatrix))
-
-    return bests_n, best_sol
\ No newline at end of file
+        with Counter.timer('penalties'):
+            penalties, ActiveCities, Increase = update_penalties(BestNeighbor, DistanceMatrix,
+                                                                 penalties, Augmented, alpha)
+            Current_f = BestNeighbor_f + Increase
+
+        # Actualizar la solución si se encuentra una mejora (costo real)
+        with Counter.timer('bookkeeping'):
+            BestNeighbor_cost = CurrentCost = CurrentCost + CostChange
+            if BestNeighbor_cost < BestCost:
+                BestSolution = BestNeighbor.copy()
+                BestCost = BestNeighbor_cost
+
+            CurrentSolution = BestNeighbor
+
+            # Registrar las mejores soluciones y costos
+            Trace.record(Counter.calls, BestCost, BestNeighbor_cost)
+
+    # Detenida antes de la primera iteración: registrar la solución inicial
+    if BestNeighbor is None:
+        BestNeighbor_cost = BestCost
+        Trace.record(Counter.calls, BestCost, BestNeighbor_cost)
+    Stop.finish(Counter.calls, BestSolution, BestCost)
+    if Checkpoint is not None:
+        save()
+
+    return trace_result(Trace, BestNeighbor_cost, BestCost)
\ No newline at end of file
@@ -0,0 +1,162 @@
+########## Libraries ##########
+import numpy as np
+import time
+
+########## Classes ##########
+
+class _NoTimer:
+    # Shared do-nothing context for the timers of a Budget without timing.
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *Exception):
+        return False
+
+_NO_TIMER = _NoTimer()
+
+class _Timer:
+    __slots__ = ('Seconds', 'Name', 'Start')
+
+    def __init__(self, Seconds, Name):
+        self.Seconds = Seconds
+        self.Name = Name
+
+    def __enter__(self):
+        self.Start = time.perf_counter()
+        return self
+
+    def __exit__(self, *Exception):
+        self.Seconds[self.Name] = self.Seconds.get(self.Name, 0.0) + time.perf_counter() - self.Start
+        return False
+
+class Budget:
+    """
+    Budget (class)
+        Input: Whether to time the sections of the solvers.
+        Description: Evaluation counter shared by TabuSearch and
+        Guided_Local_Search. It counts full evaluations of the
+        objective function (first solution, restarts, new bests)
+        apart from delta evaluations (2-opt moves of a neighborhood,
+        moves tried by the local search), plus applied moves and
+        iterations; calls, the budget compared with MaxOFcalls, is
+        their sum. With Timers, timer(Name) accumulates the seconds
+        spent in each section ('neighborhood', 'selection',
+        'local_search', 'penalties', 'bookkeeping'); without them
+        it returns a shared empty context, so the cost of the
+        instrumentation is a few attribute updates per iteration.
+    """
+    __slots__ = ('full', 'delta', 'moves', 'iterations', 'Timers', 'Seconds', 'Start')
+
+    def __init__(self, Timers=False):
+        self.full = 0
+        self.delta = 0
+        self.moves = 0
+        self.iterations = 0
+        self.Timers = Timers
+        self.Seconds = {}
+        self.Start = time.perf_counter()
+
+    @property
+    def calls(self):
+        """
+        calls (property)
+            Output: Full plus delta evaluations.
+        """
+        return self.full + self.delta
+
+    def count_full(self, Amount=1):
+        """
+        count_full (method)
+            Input: Number of full evaluations.
+        """
+        self.full += Amount
+
+    def count_delta(self, Amount):
+        """
+        count_delta (method)
+            Input: Number of delta evaluations.
+        """
+        self.delta += Amount
+
+    def count_move(self):
+        """
+        count_move (method)
+            Description: One applied move (and iteration).
+        """
+        self.moves += 1
+        self.iterations += 1
+
+    def count_iteration(self):
+        """
+        count_iteration (method)
+            Description: One iteration without a single applied
+            move (restart, local search descent).
+        """
+        self.iterations += 1
+
+    def timer(self, Name):
+        """
+        timer (method)
+            Input: Section name.
+            Output: Context manager that adds its time to Name.
+        """
+        if not self.Timers:
+            return _NO_TIMER
+        return _Timer(self.Seconds, Name)
+
+    def elapsed(self):
+        """
+        elapsed (method)
+            Output: Seconds since the counter was created.
+        """
+        return time.perf_counter() - self.Start
+
+    def report(self):
+        """
+        report (method)
+            Output: Dictionary with the counts, the elapsed time,
+            moves/sec, iterations/sec, evaluations/sec and the
+            seconds of every timed section.
+        """
+        Seconds = max(self.elapsed(), 1e-12)
+        return {'calls': self.calls, 'full': self.full, 'delta': self.delta,
+                'moves': self.moves, 'iterations': self.iterations, 'seconds': Seconds,
+                'moves_per_sec': self.moves / Seconds,
+                'iterations_per_sec': self.iterations / Seconds,
+                'evaluations_per_sec': self.calls / Seconds,
+                'timers': dict(self.Seconds)}
+
+    def get_state(self):
+        """
+        get_state (method)
+            Output: Dictionary of arrays with the counts (for
+            checkpoints).
+        """
+        return {'budget': np.array([self.full, self.delta, self.moves, self.iterations])}
+
+    def set_state(self, State):
+        """
+        set_state (method)
+            Input: Checkpoint.
+            Description: Restores the counts saved by get_state.
+        """
+        self.full, self.delta, self.moves, self.iterations = (int(x) for x in State['budget'])
+
+########## Functions ##########
+
+def format_report(Report):
+    """
+    format_report (function)
+        Input: Dictionary given by Budget.report.
+        Output: One line with the rates and the share of time of
+        every timed section.
+    """
+    Line = (f"calls {Report['calls']} (full {Report['full']}, delta {Report['delta']}), "
+            f"{Report['moves_per_sec']:.1f} moves/s, "
+            f"{Report['iterations_per_sec']:.1f} iterations/s, "
+            f"{Report['evaluations_per_sec']:.0f} evaluations/s")
+    for Name, Seconds in sorted(Report['timers'].items(), key=lambda x: -x[1]):
+        Line += f", {Name} {100 * Seconds / Report['seconds']:.0f}%"
+    return Line
@@ -0,0 +1,128 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+import queue
+from multiprocessing import Manager
+sys.path.append(os.path.dirname(__file__))
+from Parallel import run_tasks, task_seeds
+from TabuSearch import TabuSearch
+
+########## Functions migration ##########
+
+def migration_targets(Island, Islands, Policy='ring'):
+    """
+    migration_targets (function)
+        Input: Index of an island, number of islands and policy:
+        'ring' (each island sends its best tour to the next one)
+        or 'broadcast' (each island sends it to all the others, so
+        every island receives the overall best).
+        Output: Islands that receive the best tour of Island.
+    """
+    if Policy == 'ring':
+        return [(Island + 1) % Islands] if Islands > 1 else []
+    if Policy == 'broadcast':
+        return [k for k in range(Islands) if k != Island]
+    raise ValueError(f"Unknown migration policy '{Policy}' (ring or broadcast).")
+
+########## Classes ##########
+
+class Exchange:
+    """
+    Exchange (class)
+        Input: Index of the island, inboxes (queues) of all the
+        islands, iterations between migrations and policy (see
+        migration_targets).
+        Description: Migration hook of TabuSearch and
+        Guided_Local_Search (Migration argument). Every Interval
+        iterations the island sends its best tour to its targets,
+        if it improved since the last time it sent one, and adopts
+        the best tour waiting in its inbox when it is better than
+        its own best. Its tabu memory (or penalties), random
+        stream and history are kept. Nothing waits for the other
+        islands.
+    """
+    def __init__(self, Island, Inboxes, Interval=20, Policy='ring'):
+        self.Island = Island
+        self.Inboxes = Inboxes
+        self.Interval = Interval
+        self.Targets = migration_targets(Island, len(Inboxes), Policy)
+        self.Iterations = 0
+        self.Sent = np.inf
+
+    def exchange(self, BestSolution, BestCost):
+        """
+        exchange (method)
+            Input: Best solution of the island and its cost.
+            Output: (migrant tour, its cost) to adopt, or None.
+        """
+        self.Iterations += 1
+        if self.Iterations % self.Interval:
+            return None
+        if BestCost < self.Sent:
+            Migrant = (BestCost, np.asarray(BestSolution))
+            for k in self.Targets:
+                self.Inboxes[k].put(Migrant)
+            self.Sent = BestCost
+
+        Best = None
+        while True:
+            try:
+                Migrant = self.Inboxes[self.Island].get_nowait()
+            except queue.Empty:
+                break
+            if Migrant[0] < BestCost and (Best is None or Migrant[0] < Best[0]):
+                Best = Migrant
+        return None if Best is None else (Best[1], Best[0])
+
+########## Functions island model ##########
+
+def _island(DistanceMatrix, AmountNodes, *Args, Solver=TabuSearch, Callback=None, **Kwargs):
+    # Runs one island and also returns its final best tour and cost,
+    # which the solver gives to the callback at the end.
+    Best = []
+    def keep(calls, BestSolution, BestCost):
+        Best[:] = [BestSolution, BestCost]
+        return Callback is not None and Callback(calls, BestSolution, BestCost)
+    Result = Solver(DistanceMatrix, AmountNodes, *Args, Callback=keep, **Kwargs)
+    return Result, np.asarray(Best[0]), Best[1]
+
+def island_search(DistanceMatrix, Islands=4, MaxOFcalls=300000, Args=(), Kwargs=None,
+                  Solver=TabuSearch, Interval=20, Policy='ring', Seed=None, Workers=None,
+                  TimeLimit=None):
+    """
+    island_search (function)
+        Input: Distance matrix, number of islands, calls per
+        island, positional arguments after MaxOFcalls (e.g.
+        TabuSize, minErrorInten) and keyword arguments of Solver,
+        solver (TabuSearch or Guided_Local_Search), iterations
+        between migrations, migration policy (see
+        migration_targets), base seed, number of worker processes
+        (None for all cores) and time limit of every island in
+        seconds.
+        Output: Best solution, its cost and the result of every
+        island (as run_repetitions gives them).
+        Description: Island model. The islands are runs in worker
+        processes of a single run_tasks call, each with its own RNG
+        stream, tabu memory and restarts. They only share their
+        best tours, through one queue per island (Exchange). The
+        exchange is asynchronous, so unlike independent
+        repetitions the runs are not reproducible bit for bit; with
+        fewer workers than islands, the later islands receive the
+        final tours of the earlier ones. With Islands = Repetitions
+        it costs the same calls and about the same wall-clock time
+        as independent repetitions.
+    """
+    Options = dict(Kwargs or {}, Solver=Solver)
+    if TimeLimit is not None:
+        Options['TimeLimit'] = TimeLimit
+    with Manager() as Server:
+        Inboxes = [Server.Queue() for _ in range(Islands)]
+        Tasks = [(0, (MaxOFcalls,) + tuple(Args),
+                  dict(Options, Migration=Exchange(k, Inboxes, Interval, Policy)))
+                 for k in range(Islands)]
+        Runs = run_tasks(_island, [DistanceMatrix], Tasks, task_seeds(Seed, Islands), Workers)
+
+    Results, Tours, Costs = zip(*Runs)
+    k = int(np.argmin(Costs))
+    return Tours[k], Costs[k], list(Results)
@@ -0,0 +1,164 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+from collections import deque
+sys.path.append(os.path.dirname(__file__))
+from Candidates import candidate_lists
+from Tour import Tour, TwoLevelTour, tour_order
+
+########## Functions local search ##########
+
+def local_search(Solution, DistanceMatrix, Candidates=8, Active=None,
+                 MaxEvaluations=None, SegmentLength=3, Epsilon=1e-9, DontLook=None,
+                 Tracked=None):
+    """
+    local_search (function)
+        Input: Solution (permutation vector, or a Tour or
+        TwoLevelTour that is improved in place), cost matrix
+        (distance or augmented), candidate lists (number k, n x k
+        array or list of lists), cities to start with (None for
+        all), maximum number of move evaluations, maximum Or-opt
+        segment length, minimal improvement, don't-look bits kept
+        by the caller (list of n booleans, see below) and an
+        optional second cost matrix.
+        Output: Local optimum (the same tour when Solution is a
+        Tour or TwoLevelTour, a permutation vector otherwise),
+        number of move evaluations and change of the tour cost
+        in DistanceMatrix; with Tracked, also the change of its
+        cost in Tracked (e.g. the distances while the descent
+        runs on augmented costs).
+        Description: First improvement descent with 2-opt and
+        Or-opt (segments of 1 to SegmentLength cities) over the
+        candidate lists, driven by don't-look bits: only cities
+        in the queue are examined, a city whose moves do not
+        improve is dropped from it, and the endpoints of every
+        applied move are put back. A caller that descends many
+        times (GLS) passes the lists as a list of lists and its
+        own DontLook, all True between calls: only the bits of
+        Active are cleared, so a call costs O(k) per examined
+        city instead of O(n k).
+    """
+    if not isinstance(Candidates, list):
+        Candidates = candidate_lists(Candidates, DistanceMatrix).tolist()
+    tour = Solution if isinstance(Solution, (Tour, TwoLevelTour)) else Tour(Solution)
+    n = len(tour)
+    succ, pred = tour.next, tour.prev
+    D = _distance(DistanceMatrix)  # Python numbers: sums never overflow the dtype
+    T = None if Tracked is None else _distance(Tracked)
+
+    # Don't-look bits: a city is examined only while it is in the queue.
+    if DontLook is None:
+        DontLook = [True] * n
+    Queue = deque(range(n) if Active is None else (int(a) for a in Active))
+    for c in Queue:
+        DontLook[c] = False
+    evaluations = 0
+    Change = TrackedChange = _zero(DistanceMatrix)
+    if T is not None:
+        TrackedChange = _zero(Tracked)
+
+    def wake(*Cities):
+        for c in Cities:
+            if DontLook[c]:
+                DontLook[c] = False
+                Queue.append(c)
+
+    while Queue and (MaxEvaluations is None or evaluations < MaxEvaluations):
+        a = Queue.popleft()
+        DontLook[a] = True
+        improved = False
+
+        # 2-opt: new edge (a, c), in both tour directions.
+        for Forward in (True, False):
+            a2 = succ(a) if Forward else pred(a)
+            d1 = D(a, a2)
+            for c in Candidates[a]:
+                g1 = d1 - D(a, c)
+                if g1 <= 0:
+                    break
+                c2 = succ(c) if Forward else pred(c)
+                if c2 == a or c == a2:
+                    continue
+                evaluations += 1
+                Gain = g1 + D(c, c2) - D(a2, c2)
+                if Gain > Epsilon:
+                    if Forward:
+                        tour.reverse(a2, c)
+                    else:
+                        tour.reverse(c, a2)
+                    Change -= Gain
+                    if T is not None:
+                        TrackedChange += T(a, c) + T(a2, c2) - T(a, a2) - T(c, c2)
+                    wake(a, a2, c, c2)
+                    improved = True
+                    break
+            if improved:
+                break
+
+        # Or-opt: move the segment that starts at a next to a candidate.
+        L = 1
+        Inside = [a]
+        while not improved and L <= SegmentLength and L < n - 2:
+            e = Inside[-1]
+            p, nx = pred(a), succ(e)
+            Gain = D(p, a) + D(e, nx) - D(p, nx)
+            for End, c in [(a, c) for c in Candidates[a]] + [(e, c) for c in Candidates[e]]:
+                if Gain - D(End, c) <= Epsilon:
+                    continue
+                if c in Inside:
+                    continue
+                Other = e if End == a else a
+                for c2, Reversed in ((succ(c), End == e), (pred(c), End == a)):
+                    if c2 in Inside:
+                        continue
+                    evaluations += 1
+                    Net = Gain - (D(End, c) + D(Other, c2) - D(c, c2))
+                    if Net > Epsilon:
+                        # Insert between c and c2 (after whichever comes first).
+                        Left = c if c2 == succ(c) else c2
+                        tour.move_segment(a, e, Left, Reversed)
+                        Change -= Net
+                        if T is not None:
+                            TrackedChange += (T(p, nx) + T(End, c) + T(Other, c2)
+                                              - T(p, a) - T(e, nx) - T(c, c2))
+                        wake(a, e, p, nx, c, c2)
+                        improved = True
+                        break
+                if improved:
+                    break
+            Inside.append(nx)
+            L += 1
+
+    # Cities left in the queue (MaxEvaluations) get their bit back.
+    for c in Queue:
+        DontLook[c] = True
+
+    Result = (tour if tour is Solution else np.asarray(tour)), evaluations, Change
+    return Result if T is None else Result + (TrackedChange,)
+
+def _distance(DistanceMatrix):
+    # D(a, b) as a Python int or float, so sums of edges are exact even for
+    # int16 or int32 matrices (and a scalar read is cheaper than D[a, b]).
+    if isinstance(DistanceMatrix, np.ndarray):
+        return DistanceMatrix.item
+    return lambda a, b: DistanceMatrix[a, b].item()
+
+def _zero(DistanceMatrix):
+    # Exact zero of the cost type: int64 for integer matrices, float otherwise.
+    if np.dtype(DistanceMatrix.dtype).kind in 'iu':
+        return np.int64(0)
+    return 0.0
+
+def polish(Solution, DistanceMatrix, Candidates=8):
+    """
+    polish (function)
+        Input: Solution, distance matrix and candidate lists
+        (number k or n x k array).
+        Output: Polished solution and its cost.
+        Description: Fast descent with 2-opt, Or-opt and don't-look
+        bits until no candidate move improves the tour.
+    """
+    Solution, _, _ = local_search(Solution, DistanceMatrix, Candidates)
+    Order = tour_order(Solution)
+    return Solution, np.sum(DistanceMatrix[Order, np.roll(Order, -1)])
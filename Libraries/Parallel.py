@@ -0,0 +1,143 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+sys.path.append(os.path.dirname(__file__))
+from Instrumentation import Budget
+
+########## Globals ##########
+"""
+    _Instances (global variable)
+        Distance matrices attached by each worker process
+        (filled by _attach_instances).
+"""
+_Instances = []
+_Handles = []
+
+########## Functions shared memory ##########
+
+def share_matrix(Matrix):
+    """
+    share_matrix (function)
+        Input: Distance matrix.
+        Output: SharedMemory block and its spec (name, shape, dtype).
+        Description: Copies the matrix once into shared memory so
+        worker processes can attach it instead of receiving a
+        pickled copy. The caller must close and unlink the block.
+    """
+    Matrix = np.asarray(Matrix)
+    Block = shared_memory.SharedMemory(create=True, size=max(Matrix.nbytes, 1))
+    np.ndarray(Matrix.shape, dtype=Matrix.dtype, buffer=Block.buf)[...] = Matrix
+    return Block, (Block.name, Matrix.shape, Matrix.dtype.str)
+
+def attach_matrix(Spec):
+    """
+    attach_matrix (function)
+        Input: Spec returned by share_matrix.
+        Output: Read only matrix backed by the shared block and
+        the block (keep it referenced while the matrix is used).
+        Description: Only the creator unlinks the block.
+    """
+    Name, Shape, Dtype = Spec
+    Block = shared_memory.SharedMemory(name=Name)
+    Matrix = np.ndarray(Shape, dtype=np.dtype(Dtype), buffer=Block.buf)
+    Matrix.flags.writeable = False
+    return Matrix, Block
+
+def _attach_instances(Specs):
+    # Worker initializer: attach every instance once per process.
+    for Spec in Specs:
+        if isinstance(Spec, tuple):
+            Matrix, Block = attach_matrix(Spec)
+            _Handles.append(Block)
+        else:
+            Matrix = Spec  # e.g. a DistanceOracle, small enough to pickle
+        _Instances.append(Matrix)
+
+def _run_task(Solver, Instance, Args, Kwargs, SeedSeq, Instrument=False):
+    Matrix = _Instances[Instance]
+    rng = np.random.default_rng(SeedSeq)
+    if not Instrument:
+        return Solver(Matrix, len(Matrix), *Args, rng=rng, **Kwargs)
+    Counter = Budget(Timers=True)
+    Result = Solver(Matrix, len(Matrix), *Args, rng=rng, Counter=Counter, **Kwargs)
+    return Result, Counter.report()
+
+########## Functions runner ##########
+
+def task_seeds(Seed, AmountTasks):
+    """
+    task_seeds (function)
+        Input: Base seed and number of tasks.
+        Output: List of independent SeedSequences.
+        Description: Task k always gets the same RNG stream for
+        the same base seed, whatever the number of workers.
+    """
+    return np.random.SeedSequence(Seed).spawn(AmountTasks)
+
+def run_tasks(Solver, Instances, Tasks, Seeds, Workers=None, Instrument=False):
+    """
+    run_tasks (function)
+        Input: Solver, list of distance matrices, tasks as tuples
+        (instance index, positional arguments, keyword arguments),
+        one SeedSequence per task, number of worker processes
+        (None for all cores) and whether to instrument the runs.
+        Output: List with the result of every task, in order (with
+        Instrument, pairs of result and Budget.report() of the run).
+        Description: Runs the tasks in a ProcessPoolExecutor. Dense
+        matrices are placed once in shared memory and attached by
+        the workers.
+    """
+    Blocks = []
+    Specs = []
+    try:
+        for Matrix in Instances:
+            if isinstance(Matrix, np.ndarray):
+                Block, Spec = share_matrix(Matrix)
+                Blocks.append(Block)
+                Specs.append(Spec)
+            else:
+                Specs.append(Matrix)
+
+        Workers = min(Workers or os.cpu_count(), max(len(Tasks), 1))
+        with ProcessPoolExecutor(max_workers=Workers, initializer=_attach_instances,
+                                 initargs=(Specs,)) as Executor:
+            Futures = [Executor.submit(_run_task, Solver, i, tuple(Args), Kwargs or {}, SeedSeq,
+                                       Instrument)
+                       for (i, Args, Kwargs), SeedSeq in zip(Tasks, Seeds)]
+            return [Future.result() for Future in Futures]
+    finally:
+        for Block in Blocks:
+            Block.close()
+            Block.unlink()
+
+def run_repetitions(Solver, Instances, Repetitions, Args=(), Kwargs=None,
+                    Seed=None, Workers=None, Checkpoints=None, Instrument=False):
+    """
+    run_repetitions (function)
+        Input: Solver (TabuSearch, Guided_Local_Search or any
+        module level function with the same signature), list of
+        distance matrices, repetitions per instance, positional
+        and keyword arguments after (DistanceMatrix, AmountNodes),
+        base seed, number of worker processes (None for all
+        cores), directory of checkpoints (None for none) and
+        whether to instrument the runs (see run_tasks).
+        Output: List (one entry per instance) of lists with the
+        result of every repetition.
+        Description: Runs the independent repetitions with
+        run_tasks. Each repetition gets its own RNG stream (passed
+        as rng), and results come in the same order as the serial
+        loop. With Checkpoints, repetition r of instance i saves
+        its state in Checkpoints/{i}-{r}.npz and resumes from it,
+        so an interrupted experiment can be launched again.
+    """
+    Tasks = [(i, Args, Kwargs) for i in range(len(Instances)) for _ in range(Repetitions)]
+    if Checkpoints is not None:
+        os.makedirs(Checkpoints, exist_ok=True)
+        Tasks = [(i, Args, dict(Kwargs or {}, Resume=True,
+                                Checkpoint=os.path.join(Checkpoints, f"{i}-{r % Repetitions}.npz")))
+                 for r, (i, Args, Kwargs) in enumerate(Tasks)]
+    Results = run_tasks(Solver, Instances, Tasks, task_seeds(Seed, len(Tasks)), Workers, Instrument)
+    return [Results[i*Repetitions:(i + 1)*Repetitions] for i in range(len(Instances))]
@@ -0,0 +1,123 @@
+########## Libraries ##########
+import numpy as np
+from math import ceil, sqrt
+from statistics import NormalDist
+
+########## Functions statistics ##########
+
+def _ranks(Values):
+    # Ranks 1..k of a block (1 is the best), ties share their mean rank.
+    Values = np.asarray(Values, dtype=float)
+    Ranks = np.empty(len(Values))
+    Ranks[np.argsort(Values, kind='stable')] = np.arange(1, len(Values) + 1)
+    _, Inverse, Counts = np.unique(Values, return_inverse=True, return_counts=True)
+    return np.bincount(Inverse, Ranks)[Inverse] / Counts[Inverse]
+
+def _chi2_sf(x, v):
+    # Upper tail of the chi-square distribution (Wilson-Hilferty).
+    if x <= 0:
+        return 1.0
+    z = ((x / v) ** (1 / 3) - (1 - 2 / (9 * v))) / sqrt(2 / (9 * v))
+    return 1 - NormalDist().cdf(z)
+
+def rank_sums(Errors):
+    """
+    rank_sums (function)
+        Input: Matrix of errors, blocks x configurations.
+        Output: Rank sum of each configuration.
+    """
+    return np.array([_ranks(Row) for Row in np.asarray(Errors, dtype=float)]).sum(axis=0)
+
+def friedman_test(Errors):
+    """
+    friedman_test (function)
+        Input: Matrix of errors, blocks (instance runs) x
+        configurations.
+        Output: p-value of the Friedman test and rank sum of each
+        configuration.
+        Description: Friedman statistic with the correction for
+        ties (Conover), compared with its chi-square approximation.
+    """
+    Errors = np.asarray(Errors, dtype=float)
+    b, k = Errors.shape
+    Ranks = np.array([_ranks(Row) for Row in Errors])
+    R = Ranks.sum(axis=0)
+    Denominator = np.sum(Ranks**2) - b * k * (k + 1)**2 / 4
+    if k < 2 or Denominator <= 0:
+        return 1.0, R
+    T = (k - 1) * np.sum((R - b * (k + 1) / 2)**2) / Denominator
+    return _chi2_sf(T, k - 1), R
+
+def eliminate(Errors, Alpha=0.05):
+    """
+    eliminate (function)
+        Input: Matrix of errors, blocks x configurations, and
+        significance level.
+        Output: Boolean vector, True for the configurations that
+        survive.
+        Description: When the Friedman test rejects that all the
+        configurations are equal, the ones whose rank sum is worse
+        than the best by more than the critical difference
+        z * sqrt(b k (k + 1) / 6) are eliminated.
+    """
+    Errors = np.asarray(Errors, dtype=float)
+    b, k = Errors.shape
+    p, R = friedman_test(Errors)
+    if p >= Alpha:
+        return np.ones(k, dtype=bool)
+    Critical = NormalDist().inv_cdf(1 - Alpha / 2) * sqrt(b * k * (k + 1) / 6)
+    return R - R.min() <= Critical
+
+########## Functions racing ##########
+
+def race(Evaluate, AmountConfigurations, Stages, Eta=2, Alpha=0.05,
+         FirstTest=3, MinSurvivors=1):
+    """
+    race (function)
+        Input: Evaluate(Alive, Budget, Instance, Block), which
+        returns the error of each configuration index in Alive on
+        one run; number of configurations; stages as a list of
+        (Budget, list of instances), from the cheapest; halving
+        factor Eta; significance level; blocks seen in a stage
+        before the first test; minimal number of survivors.
+        Output: Survivors (configuration indices, best first) and,
+        for every configuration, the list of its mean errors in
+        the stages it ran.
+        Description: Racing with successive halving. In every
+        stage the alive configurations run each instance (block)
+        with the stage budget; after FirstTest blocks the Friedman
+        test eliminates the ones significantly worse than the
+        best. At the end of each stage but the last only the best
+        1/Eta by mean rank go on to the next, bigger one.
+    """
+    Alive = list(range(AmountConfigurations))
+    StageErrors = [[] for _ in range(AmountConfigurations)]
+    Block = 0
+
+    for s, (Budget, StageInstances) in enumerate(Stages):
+        Errors = {c: [] for c in Alive}
+        for Instance in StageInstances:
+            for c, Error in zip(Alive, Evaluate(Alive, Budget, Instance, Block)):
+                Errors[c].append(Error)
+            Block += 1
+
+            # Statistical elimination on the blocks of this stage.
+            if len(Errors[Alive[0]]) >= FirstTest and len(Alive) > MinSurvivors:
+                Matrix = np.array([Errors[c] for c in Alive]).T
+                Keep = eliminate(Matrix, Alpha)
+                Best = np.argsort(rank_sums(Matrix), kind='stable')[:MinSurvivors]
+                Keep[Best] = True
+                for c in [c for c, k in zip(Alive, Keep) if not k]:
+                    StageErrors[c].append(float(np.mean(Errors[c])))
+                Alive = [c for c, k in zip(Alive, Keep) if k]
+
+        for c in Alive:
+            StageErrors[c].append(float(np.mean(Errors[c])))
+
+        # Order by mean rank on this stage and keep the best 1/Eta.
+        Matrix = np.array([Errors[c] for c in Alive]).T
+        Alive = [Alive[i] for i in np.argsort(rank_sums(Matrix), kind='stable')]
+        if s < len(Stages) - 1:
+            Alive = Alive[:max(ceil(len(Alive) / Eta), MinSurvivors)]
+
+    return Alive, StageErrors
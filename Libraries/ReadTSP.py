@@ -1,5 +1,8 @@
 ########## Libraries ##########
 import numpy as np
+import os
+import hashlib
+from collections import OrderedDict
 
 ########## Functions ##########
 
@@ -15,6 +18,88 @@ def EuclidianDistance(node_A , node_B):
     return np.sqrt((node_B[0]-node_A[0])**2 
                        + (node_B[1]-node_A[1])**2)
 
+def NodeDistances(NodesA, NodesB, EdgeWeightType='EUC_2D'):
+    """
+    NodeDistances (function)
+        Input: Two arrays of coordenates (last axis x, y) with
+        broadcastable shapes and the TSPLIB EDGE_WEIGHT_TYPE.
+        Output: Array of distances.
+        Description: Distance between the nodes of NodesA and
+        NodesB following the TSPLIB definitions. EUC_2D is kept
+        unrounded.
+    """
+    NodesA = np.asarray(NodesA, dtype=float)
+    NodesB = np.asarray(NodesB, dtype=float)
+
+    if EdgeWeightType == 'GEO':
+        # Coordenates are DDD.MM (degrees and minutes).
+        RRR = 6378.388
+        LatA, LonA = _GeoRadians(NodesA[..., 0]), _GeoRadians(NodesA[..., 1])
+        LatB, LonB = _GeoRadians(NodesB[..., 0]), _GeoRadians(NodesB[..., 1])
+        q1 = np.cos(LonA - LonB)
+        q2 = np.cos(LatA - LatB)
+        q3 = np.cos(LatA + LatB)
+        Arc = np.arccos(np.clip(0.5*((1.0 + q1)*q2 - (1.0 - q1)*q3), -1.0, 1.0))
+        Distance = np.trunc(RRR*Arc + 1.0)
+        # Same node has distance 0 (the formula gives 1).
+        Same = (NodesA[..., 0] == NodesB[..., 0]) & (NodesA[..., 1] == NodesB[..., 1])
+        return np.where(Same, 0.0, Distance)
+
+    dx = NodesA[..., 0] - NodesB[..., 0]
+    dy = NodesA[..., 1] - NodesB[..., 1]
+    if EdgeWeightType == 'EUC_2D':
+        return np.sqrt(dx*dx + dy*dy)
+    if EdgeWeightType == 'CEIL_2D':
+        return np.ceil(np.sqrt(dx*dx + dy*dy))
+    if EdgeWeightType == 'ATT':
+        # Pseudo-Euclidean distance.
+        r = np.sqrt((dx*dx + dy*dy) / 10.0)
+        t = np.floor(r + 0.5)
+        return np.where(t < r, t + 1.0, t)
+    raise ValueError(f"EDGE_WEIGHT_TYPE '{EdgeWeightType}' is not supported.")
+
+def _GeoRadians(x):
+    # TSPLIB takes the integer part of DDD.MM as degrees.
+    deg = np.trunc(x)
+    return 3.141592 * (deg + 5.0 * (x - deg) / 3.0) / 180.0
+
+def TsplibRound(Distances, dtype=None):
+    """
+    TsplibRound (function)
+        Input: Array of distances and dtype ('int32', 'int16',
+        'float32', 'float64' or None).
+        Output: Array of distances.
+        Description: With a dtype, distances are rounded to the
+        nearest integer as TSPLIB does (nint) and stored with that
+        dtype. None keeps the unrounded float64 distances.
+    """
+    if dtype is None:
+        return Distances
+    dtype = np.dtype(dtype)
+    Rounded = np.floor(np.asarray(Distances) + 0.5)
+    if dtype.kind == 'i' and Rounded.size and Rounded.max() > np.iinfo(dtype).max:
+        raise ValueError(f"Distances do not fit in {dtype} (max {Rounded.max():.0f}).")
+    return Rounded.astype(dtype)
+
+def CoordinateDistanceMatrix(Coordinates, EdgeWeightType='EUC_2D', ChunkSize=1024, dtype=None):
+    """
+    CoordinateDistanceMatrix (function)
+        Input: Array (n x 2) with the coordenates, EDGE_WEIGHT_TYPE,
+        number of rows computed at once and dtype (see TsplibRound).
+        Output: Distance matrix for all pairs.
+        Description: Builds the matrix by blocks of rows with
+        broadcasting, so the temporary arrays stay bounded.
+    """
+    Coordinates = np.asarray(Coordinates, dtype=float)
+    n = len(Coordinates)
+    Matrix = np.empty((n, n), dtype=dtype or float)
+    for start in range(0, n, ChunkSize):
+        stop = min(start + ChunkSize, n)
+        Matrix[start:stop] = TsplibRound(NodeDistances(Coordinates[start:stop, None, :],
+                                                       Coordinates[None, :, :],
+                                                       EdgeWeightType), dtype)
+    return Matrix
+
 def EuclideanDistanceMatrix(NodeList, Tam_Nodes):
     """
     EuclideanDistanceMatrix (function) 
@@ -25,60 +110,321 @@ def EuclideanDistanceMatrix(NodeList, Tam_Nodes):
         Description: Calculates Euclidean distance
         Matrix for each pairs of locations.
     """
-    # Create zeros matrix.
-    Matrix = np.zeros((Tam_Nodes,Tam_Nodes))
+    return CoordinateDistanceMatrix(np.asarray(NodeList, dtype=float)[:Tam_Nodes], 'EUC_2D')
 
-    # Vector x1 - Vector x2.
-    for i in range(0, Tam_Nodes):
-        for j in range(i+1, Tam_Nodes):
-            Matrix[i][j] = (EuclidianDistance(NodeList[i], NodeList[j]))
-            Matrix[j][i] = Matrix[i][j]
+class DistanceOracle:
+    """
+    DistanceOracle (class)
+        Input: Array (n x 2) with the coordenates, EDGE_WEIGHT_TYPE,
+        number of rows kept in cache, dtype (see TsplibRound) and
+        number of node pairs kept in cache (None for 16 n).
+        Description: Distance "matrix" computed on demand from the
+        coordenates, for instances too large for an n x n array.
+        It supports the indexing of a dense matrix: D[a, b] with
+        scalars or vectors, D[i][j] and blocks of rows D[start:stop].
+        Two bounded LRU caches keep memory linear in n: full rows
+        (np.asarray(D[i]) or row(i)) and single distances D[a, b]
+        (the pairs a search reads again and again: tour edges and
+        candidate neighbors). Scalar reads are served by a cached
+        row, then by the pair cache, and refresh the entry they
+        use; a miss computes the pair and keeps it. Vector reads
+        use a cached row for D[a, B] and otherwise compute the
+        distances at once, which costs about as much as a gather.
+    """
+    def __init__(self, Coordinates, EdgeWeightType='EUC_2D', CacheRows=256, dtype=None,
+                 CachePairs=None):
+        self.Coordinates = np.asarray(Coordinates, dtype=float)
+        self.EdgeWeightType = EdgeWeightType
+        self.CacheRows = CacheRows
+        self.shape = (len(self.Coordinates), len(self.Coordinates))
+        self.CachePairs = 16 * self.shape[0] if CachePairs is None else CachePairs
+        self.Rounding = dtype
+        self.dtype = np.dtype(dtype or float)
+        self._rows = OrderedDict()
+        self._pairs = OrderedDict()
 
-    return Matrix
+    def _distances(self, NodesA, NodesB):
+        return TsplibRound(NodeDistances(NodesA, NodesB, self.EdgeWeightType), self.Rounding)
+
+    def __len__(self):
+        return self.shape[0]
 
-def ReadTsp(filename):
+    def row(self, i):
+        """
+        row (method)
+            Input: Node i (0-based).
+            Output: Distances from i to every node.
+            Description: Full row, from the LRU cache if present.
+        """
+        i = int(i)
+        Row = self._rows.get(i)
+        if Row is not None:
+            self._rows.move_to_end(i)
+            return Row
+        Row = self._distances(self.Coordinates[i], self.Coordinates)
+        self._rows[i] = Row
+        if len(self._rows) > self.CacheRows:
+            self._rows.popitem(last=False)
+        return Row
+
+    def distance(self, a, b):
+        """
+        distance (method)
+            Input: Nodes a and b (0-based).
+            Output: Distance between them.
+            Description: From the cached row of a if present,
+            otherwise from the LRU cache of pairs (computed and kept
+            when missing; the distances are symmetric).
+        """
+        a, b = int(a), int(b)
+        Row = self._rows.get(a)
+        if Row is not None:
+            self._rows.move_to_end(a)
+            return Row[b]
+        Key = (a, b) if a <= b else (b, a)
+        Distance = self._pairs.get(Key)
+        if Distance is not None:
+            self._pairs.move_to_end(Key)
+            return Distance
+        Distance = self._distances(self.Coordinates[a], self.Coordinates[b])
+        self._pairs[Key] = Distance
+        if len(self._pairs) > self.CachePairs:
+            self._pairs.popitem(last=False)
+        return Distance
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            A, B = key
+            if isinstance(A, slice) or isinstance(B, slice):
+                A = np.arange(self.shape[0])[A] if isinstance(A, slice) else np.asarray(A)
+                B = np.arange(self.shape[1])[B] if isinstance(B, slice) else np.asarray(B)
+                A, B = np.ix_(np.atleast_1d(A), np.atleast_1d(B))
+            elif np.ndim(A) == 0:
+                if np.ndim(B) == 0:
+                    return self.distance(A, B)
+                Row = self._rows.get(int(A))
+                if Row is not None:
+                    self._rows.move_to_end(int(A))
+                    return Row[B]
+            return self._distances(self.Coordinates[A], self.Coordinates[B])
+
+        if isinstance(key, slice) or np.ndim(key) > 0:
+            return self._distances(self.Coordinates[key][:, None, :], self.Coordinates[None, :, :])
+        return _OracleRow(self, int(key))
+
+    def __array__(self, dtype=None, copy=None):
+        Matrix = CoordinateDistanceMatrix(self.Coordinates, self.EdgeWeightType, dtype=self.Rounding)
+        return np.asarray(Matrix, dtype=dtype)
+
+class _OracleRow:
+    # Row i of a DistanceOracle: D[i][j] computes a single distance,
+    # np.asarray(D[i]) the full (cached) row.
+    __slots__ = ('Oracle', 'i')
+
+    def __init__(self, Oracle, i):
+        self.Oracle = Oracle
+        self.i = i
+
+    def __len__(self):
+        return len(self.Oracle)
+
+    def __getitem__(self, j):
+        return self.Oracle[self.i, j]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.Oracle.row(self.i), dtype=dtype)
+
+def ExplicitDistanceMatrix(Weights, Dimension, EdgeWeightFormat='FULL_MATRIX', dtype=None):
     """
-    ReadTsp (function)
-        Input: File name.
-        Output: Distance Matrix.
-        Description: Read a TSP instance (.tsp file)
-        and creates discance matrix.
+    ExplicitDistanceMatrix (function)
+        Input: Numbers of EDGE_WEIGHT_SECTION, dimension,
+        EDGE_WEIGHT_FORMAT and dtype (see TsplibRound).
+        Output: Distance matrix for all pairs.
+        Description: Arranges an explicit TSPLIB weight list
+        (FULL_MATRIX, UPPER_ROW, LOWER_ROW, UPPER_DIAG_ROW or
+        LOWER_DIAG_ROW) as a symmetric matrix.
     """
-    # Input.
-    infile = open(filename,'r')
+    Weights = np.asarray(Weights, dtype=float)
+    n = Dimension
+    if EdgeWeightFormat == 'FULL_MATRIX':
+        return TsplibRound(Weights[:n*n].reshape(n, n).copy(), dtype)
 
-    # Read instance first line (last element should be
-    # filename).
-    Name = infile.readline().strip().split()[-1]
+    Triangles = {
+        'UPPER_ROW': lambda: np.triu_indices(n, k=1),
+        'LOWER_ROW': lambda: np.tril_indices(n, k=-1),
+        'UPPER_DIAG_ROW': lambda: np.triu_indices(n, k=0),
+        'LOWER_DIAG_ROW': lambda: np.tril_indices(n, k=0),
+    }
+    if EdgeWeightFormat not in Triangles:
+        raise ValueError(f"EDGE_WEIGHT_FORMAT '{EdgeWeightFormat}' is not supported.")
 
-    # Skip comments until DIMENSION.
-    for line in infile:
-        # Reading line.
-        broken_line = line.strip().split()
+    Rows, Cols = Triangles[EdgeWeightFormat]()
+    Matrix = np.zeros((n, n))
+    Matrix[Rows, Cols] = Weights[:len(Rows)]
+    Matrix[Cols, Rows] = Weights[:len(Rows)]
+    return TsplibRound(Matrix, dtype)
 
-        # Verification of DIMENSION.
-        if(broken_line[0] == 'DIMENSION' or broken_line[0] == 'DIMENSION:'):
-            Dimension = broken_line[-1]
+def ParseTsp(filename):
+    """
+    ParseTsp (function)
+        Input: File name.
+        Output: Header (dictionary with the specification part),
+        coordenates (n x 2 array or None) and explicit weights
+        (vector or None).
+        Description: Reads a TSPLIB file in one pass. Every data
+        section is converted at once into a NumPy array.
+    """
+    with open(filename, 'r') as infile:
+        lines = infile.read().splitlines()
 
-        # Verification of EOF or Node coordenates secction.
-        elif(broken_line[0] == 'EOF' or broken_line[0] == 'NODE_COORD_SECTION'):
+    Header = {}
+    Sections = {}
+    k = 0
+    while k < len(lines):
+        line = lines[k].strip()
+        k += 1
+        if not line:
+            continue
+        if line.startswith('EOF'):
             break
 
-    # Take coordenates.
-    nodelist = []
-    int_dim = int(Dimension)
-    for i in range(0, int_dim):
-        x,y = infile.readline().strip().split()[1:]
-        nodelist.append([float(x), float(y)])
-    
-    # Close input file.
-    infile.close()
-    
-    # Create distance matrix.
-    DistanceMatrix = EuclideanDistanceMatrix(nodelist,int_dim)
-    print(Name)
+        # Data section: every line until the next keyword.
+        key = line.split(':')[0].strip()
+        if key.endswith('_SECTION'):
+            start = k
+            while k < len(lines) and not lines[k].strip()[:1].isalpha():
+                k += 1
+            Sections[key] = np.array(' '.join(lines[start:k]).split(), dtype=float)
+
+        # Specification: 'KEY : VALUE'.
+        else:
+            Header[key] = line.split(':', 1)[-1].strip()
+
+    Dimension = int(Header['DIMENSION'])
+    Coordinates = None
+    if 'NODE_COORD_SECTION' in Sections:
+        Nodes = Sections['NODE_COORD_SECTION'].reshape(-1, 3)
+        Coordinates = np.empty((Dimension, 2))
+        Coordinates[Nodes[:, 0].astype(int) - 1] = Nodes[:, 1:]
+
+    return Header, Coordinates, Sections.get('EDGE_WEIGHT_SECTION')
+
+def BuildDistanceMatrix(Header, Coordinates, Weights, dtype=None):
+    """
+    BuildDistanceMatrix (function)
+        Input: Header, coordenates and explicit weights (as given
+        by ParseTsp) and dtype (see TsplibRound).
+        Output: Distance matrix.
+        Description: Builds the distance matrix according to the
+        EDGE_WEIGHT_TYPE of the instance (EUC_2D by default).
+    """
+    EdgeWeightType = Header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    if EdgeWeightType == 'EXPLICIT':
+        return ExplicitDistanceMatrix(Weights, int(Header['DIMENSION']),
+                                      Header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'), dtype)
+    return CoordinateDistanceMatrix(Coordinates, EdgeWeightType, dtype=dtype)
+
+def CachedDistanceMatrix(filename, CacheDir, dtype=None):
+    """
+    CachedDistanceMatrix (function)
+        Input: File name, cache directory and dtype (see TsplibRound).
+        Output: Distance matrix (read only, memory mapped).
+        Description: The matrix of each instance is stored as a
+        .npy file named after a hash of the instance content, so
+        a modified instance never reuses an old matrix (its stale
+        entries are removed). Later runs and parallel workers map
+        the same file instead of rebuilding the matrix.
+    """
+    with open(filename, 'rb') as infile:
+        Key = hashlib.sha1(infile.read()).hexdigest()[:16]
+
+    Stem = os.path.splitext(os.path.basename(filename))[0]
+    Kind = np.dtype(dtype).name if dtype is not None else 'raw'
+    CachePath = os.path.join(CacheDir, f"{Stem}-{Key}-{Kind}.npy")
+
+    if not os.path.exists(CachePath):
+        Header, Coordinates, Weights = ParseTsp(filename)
+        DistanceMatrix = BuildDistanceMatrix(Header, Coordinates, Weights, dtype)
+
+        # Remove entries of older versions of the instance (same stem, other
+        # hash; the stem may itself contain '-', so it is compared exactly).
+        os.makedirs(CacheDir, exist_ok=True)
+        for Old in os.listdir(CacheDir):
+            Fields = Old[:-len('.npy')].rsplit('-', 2) if Old.endswith('.npy') else []
+            if len(Fields) == 3 and Fields[0] == Stem and Fields[1] != Key:
+                try:
+                    os.remove(os.path.join(CacheDir, Old))
+                except FileNotFoundError:
+                    pass  # Already removed by another worker
+
+        # Atomic write: other processes never see a partial file.
+        TmpPath = f"{CachePath}.{os.getpid()}.tmp"
+        with open(TmpPath, 'wb') as outfile:
+            np.save(outfile, DistanceMatrix)
+        os.replace(TmpPath, CachePath)
+
+    return np.load(CachePath, mmap_mode='r')
+
+def ReadTsp(filename, CacheDir=None, dtype=None):
+    """
+    ReadTsp (function)
+        Input: File name, optionally a cache directory and the
+        dtype of the matrix ('int32', 'int16', 'float32' or
+        'float64' with TSPLIB rounding, None for unrounded float64).
+        Output: Distance Matrix.
+        Description: Read a TSP instance (.tsp file)
+        and creates discance matrix. With CacheDir the
+        matrix is loaded from (or saved to) the cache.
+    """
+    if CacheDir is not None:
+        DistanceMatrix = CachedDistanceMatrix(filename, CacheDir, dtype)
+        print(os.path.splitext(os.path.basename(filename))[0])
+        return DistanceMatrix
+
+    Header, Coordinates, Weights = ParseTsp(filename)
+    DistanceMatrix = BuildDistanceMatrix(Header, Coordinates, Weights, dtype)
+    print(Header.get('NAME', os.path.basename(filename)))
     return DistanceMatrix
 
+def ReadTspOracle(filename, CacheRows=256, dtype=None):
+    """
+    ReadTspOracle (function)
+        Input: File name, number of rows kept in cache and dtype
+        (see ReadTsp).
+        Output: DistanceOracle of the instance.
+        Description: Like ReadTsp but without building the
+        n x n matrix (only for instances with coordenates).
+    """
+    Header, Coordinates, Weights = ParseTsp(filename)
+    if Coordinates is None:
+        raise ValueError(f"'{filename}' has no NODE_COORD_SECTION.")
+    print(Header.get('NAME', os.path.basename(filename)))
+    return DistanceOracle(Coordinates, Header.get('EDGE_WEIGHT_TYPE', 'EUC_2D'), CacheRows, dtype)
+
+def ReadOptimals(filename):
+    """
+    ReadOptimals (function)
+        Input: File with lines 'name : value' (Optimals.txt).
+        Output: Dictionary of optimal values by instance name.
+        Description: Lets every instance get its own optimum by
+        name, whatever order the instances are listed in.
+    """
+    Optimals = {}
+    with open(filename, 'r') as infile:
+        for line in infile.read().replace('EOF', '\n').splitlines():
+            if ':' in line:
+                Name, Value = line.split(':', 1)
+                Optimals[Name.strip()] = float(Value)
+    return Optimals
+
+def InstanceName(filename):
+    """
+    InstanceName (function)
+        Input: File name of an instance.
+        Output: Its name (file name without directory and extension).
+    """
+    return os.path.splitext(os.path.basename(filename))[0]
+
 def ReadTSP_optTour(filename):
     """
     Función para leer un archivo con formato 'id : valor'.
@@ -0,0 +1,85 @@
+########## Libraries ##########
+import numpy as np
+
+########## Classes ##########
+
+class SparseEdgeMatrix:
+    """
+    SparseEdgeMatrix (class)
+        Input: Number of nodes and dtype of the values.
+        Description: n x n matrix that only stores its non zero
+        entries, as sorted keys a * n + b. It supports the
+        indexing M[A, B] (scalars or vectors, reading and
+        writing) of a dense matrix, so it can replace one when
+        n x n memory is not affordable. Reading a vector of
+        entries is a binary search per entry.
+    """
+    def __init__(self, AmountNodes, dtype=np.int32):
+        self.n = AmountNodes
+        self.shape = (AmountNodes, AmountNodes)
+        self.dtype = np.dtype(dtype)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return self.n
+
+    def _find(self, key):
+        A, B = key
+        K = np.atleast_1d(np.asarray(A, dtype=np.int64) * self.n + np.asarray(B, dtype=np.int64))
+        idx = np.searchsorted(self.keys, K)
+        found = idx < len(self.keys)
+        found[found] = self.keys[idx[found]] == K[found]
+        return K, idx, found
+
+    def __getitem__(self, key):
+        K, idx, found = self._find(key)
+        Out = np.zeros(K.shape, dtype=self.dtype)
+        Out[found] = self.values[idx[found]]
+        return Out if np.ndim(key[0]) or np.ndim(key[1]) else Out[0]
+
+    def __setitem__(self, key, value):
+        K, idx, found = self._find(key)
+        V = np.broadcast_to(np.asarray(value, dtype=self.dtype), K.shape)
+        self.values[idx[found]] = V[found]
+
+        # New entries (the last value wins for repeated keys).
+        if not found.all():
+            NewK, NewV = K[~found][::-1], V[~found][::-1]
+            NewK, First = np.unique(NewK, return_index=True)
+            At = np.searchsorted(self.keys, NewK)
+            self.keys = np.insert(self.keys, At, NewK)
+            self.values = np.insert(self.values, At, NewV[First])
+
+    def add(self, A, B, Value=1):
+        """
+        add (method)
+            Input: Vectors of rows A and columns B and the value
+            to add (scalar or vector).
+            Description: M[A, B] += Value, accumulating repeated
+            pairs like np.add.at.
+        """
+        K = np.asarray(A, dtype=np.int64).ravel() * self.n + np.asarray(B, dtype=np.int64).ravel()
+        V = np.broadcast_to(np.asarray(Value, dtype=self.dtype), K.shape)
+        Keys, Inverse = np.unique(K, return_inverse=True)
+        Sums = np.zeros(len(Keys), dtype=self.dtype)
+        np.add.at(Sums, Inverse, V)
+        self[Keys // self.n, Keys % self.n] = self[Keys // self.n, Keys % self.n] + Sums
+
+    def drop_upto(self, Threshold):
+        """
+        drop_upto (method)
+            Input: Threshold.
+            Description: Removes the entries whose value is not
+            greater than Threshold (they read as 0 afterwards).
+        """
+        Keep = self.values > Threshold
+        self.keys = self.keys[Keep]
+        self.values = self.values[Keep]
+
+    def nnz(self):
+        """
+        nnz (method)
+            Output: Number of stored entries.
+        """
+        return len(self.keys)
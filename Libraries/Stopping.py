@@ -0,0 +1,70 @@
+########## Libraries ##########
+import time
+
+########## Classes ##########
+
+class StopCriteria:
+    """
+    StopCriteria (class)
+        Input: Time limit in seconds, known optimal value, target
+        gap and callback (all optional).
+        Description: Stopping criteria checked by TabuSearch and
+        Guided_Local_Search once per iteration, besides MaxOFcalls.
+        The run stops when TimeLimit seconds have passed since the
+        start, when (BestCost - Optimal) / Optimal <= TargetGap, or
+        when Callback(calls, BestSolution, BestCost) returns True.
+        The callback gets the best-so-far solution (a Tour;
+        np.asarray gives the permutation vector) at every
+        iteration and once more at the end (finish), so the caller
+        can keep it (anytime use) and cancel the run cleanly.
+        Reason tells what stopped it.
+    """
+    def __init__(self, TimeLimit=None, Optimal=None, TargetGap=0.0, Callback=None):
+        self.TimeLimit = TimeLimit
+        self.Optimal = Optimal
+        self.TargetGap = TargetGap
+        self.Callback = Callback
+        self.Start = time.perf_counter()
+        self.Reason = None
+
+    def elapsed(self):
+        """
+        elapsed (method)
+            Output: Seconds since the criteria were created.
+        """
+        return time.perf_counter() - self.Start
+
+    def gap(self, BestCost):
+        """
+        gap (method)
+            Input: Best cost.
+            Output: Relative gap to Optimal (None if unknown).
+        """
+        if self.Optimal is None:
+            return None
+        return (BestCost - self.Optimal) / self.Optimal
+
+    def stop(self, calls, BestSolution, BestCost):
+        """
+        stop (method)
+            Input: Calls so far, best solution and its cost.
+            Output: True if the run must stop.
+        """
+        if self.TimeLimit is not None and self.elapsed() >= self.TimeLimit:
+            self.Reason = 'time'
+        elif self.Optimal is not None and self.gap(BestCost) <= self.TargetGap:
+            self.Reason = 'target'
+        elif self.Callback is not None and self.Callback(calls, BestSolution, BestCost):
+            self.Reason = 'callback'
+        return self.Reason is not None
+
+    def finish(self, calls, BestSolution, BestCost):
+        """
+        finish (method)
+            Input: Calls, best solution and its cost at the end.
+            Description: Gives the final best solution to Callback
+            (its answer is ignored), unless the callback itself
+            stopped the run and so has already seen it.
+        """
+        if self.Callback is not None and self.Reason != 'callback':
+            self.Callback(calls, BestSolution, BestCost)
@@ -0,0 +1,77 @@
+########## Libraries ##########
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+from SparseEdges import SparseEdgeMatrix
+from Tour import tour_order
+
+########## Functions Tabu memory ##########
+
+def new_tabu_memory(AmountNodes, Sparse=False):
+    """
+    new_tabu_memory (function)
+        Input: Number of nodes and whether to use a sparse memory.
+        Output: Tabu memory (n x n integer matrix).
+        Description: Entry [a, b] stores the iteration until
+        which the edge (a, b) may not be added back to the tour
+        (0 means the edge is free). Nodes are 0-based. The
+        sparse memory only holds the edges that are still tabu.
+    """
+    if Sparse:
+        return SparseEdgeMatrix(AmountNodes, np.int64)
+    return np.zeros((AmountNodes, AmountNodes), dtype=np.int32)
+
+def move_edges(Solution, I, J):
+    """
+    move_edges (function)
+        Input: Solution and the move indices (scalars or vectors) I, J.
+        Output: Cities A, B, C, D (0-based) of the 2-opt move.
+        Description: A 2-opt move (i, j) removes the edges (A, B)
+        and (C, D) and adds the edges (A, C) and (B, D).
+    """
+    Tour = tour_order(Solution)
+    n = len(Tour)
+    return Tour[I - 1], Tour[I], Tour[J], Tour[(J + 1) % n]
+
+def tabu_mask(Memory, Solution, I, J, Iteration):
+    """
+    tabu_mask (function)
+        Input: Tabu memory, solution, move vectors I, J and
+        current iteration.
+        Output: Boolean vector, True for tabu moves.
+        Description: A move is tabu if one of the edges it adds
+        was removed less than TabuSize iterations ago. Each check
+        is two lookups in the memory.
+    """
+    A, B, C, D = move_edges(Solution, I, J)
+    return (Memory[A, C] > Iteration) | (Memory[B, D] > Iteration)
+
+def make_tabu(Memory, Solution, i, j, Iteration, TabuSize):
+    """
+    make_tabu (function)
+        Input: Tabu memory, solution before the move, move (i, j),
+        current iteration and tabu tenure.
+        Output: None.
+        Description: Forbids adding back the two edges removed
+        by the move during the next TabuSize iterations. Old
+        entries expire by themselves, in the order they were made.
+    """
+    A, B, C, D = move_edges(Solution, i, j)
+    if isinstance(Memory, SparseEdgeMatrix):
+        Memory.drop_upto(Iteration)
+    Memory[A, B] = Memory[B, A] = Iteration + TabuSize
+    Memory[C, D] = Memory[D, C] = Iteration + TabuSize
+
+def admissible_moves(Memory, Solution, I, J, Delta, Iteration, CurrentCost, BestCost):
+    """
+    admissible_moves (function)
+        Input: Tabu memory, solution, neighborhood (I, J, Delta),
+        current iteration, current cost and best cost found.
+        Output: Boolean vector, True for the moves that may be taken.
+        Description: Non tabu moves plus the tabu moves that
+        satisfy the aspiration criterion (they improve the best
+        solution found so far).
+    """
+    Tabu = tabu_mask(Memory, Solution, I, J, Iteration)
+    return ~Tabu | (CurrentCost + Delta < BestCost)
@@ -1,13 +1,52 @@
 ########## Libraries ##########
 import numpy as np
-import copy
+import os
+import sys
+from functools import lru_cache
+sys.path.append(os.path.dirname(__file__))
+from TabuMemory import (
+    new_tabu_memory,
+    make_tabu,
+    admissible_moves
+)
+from Candidates import (
+    candidate_lists,
+    solver_candidates,
+    candidate_moves,
+    ORACLE_CANDIDATES
+)
+from LocalSearch import local_search
+from Construction import initial_solution, restart_solution
+from Instrumentation import Budget
+from Tour import Tour, TwoLevelTour, tour_order
+from Stopping import StopCriteria
+from Trace import MemoryTrace, trace_result
+from Checkpoint import (
+    save_checkpoint,
+    load_checkpoint,
+    pack_rng,
+    unpack_rng,
+    pack_matrix,
+    unpack_matrix
+)
 
 ########## Functions TS ##########
 
+def cost_dtype(DistanceMatrix):
+    """
+    cost_dtype (function)
+        Input: Distance matrix.
+        Output: int64 for integer matrices, float64 otherwise.
+        Description: Type used to add up costs, so compact
+        matrices (int16, float32) do not overflow or lose
+        precision in tour costs and move deltas.
+    """
+    return np.int64 if np.dtype(DistanceMatrix.dtype).kind in 'iu' else np.float64
+
 def ObjFun(Solution, DistanceMatrix):
     """
     ObjFun (function)
-        Input: Permutation vector and
+        Input: Permutation vector (or tour) and
         distance matrix.
         Output: Value in objective function.
         Description: Calculates the objective
@@ -16,18 +55,41 @@ def ObjFun(Solution, DistanceMatrix):
         The TSP objective function is the sum
         of all edge's cost.
     """
-    return sum(DistanceMatrix[Solution[i] - 1][Solution[i + 1] - 1] for i in range(len(Solution) - 1)) + \
-            DistanceMatrix[Solution[-1] - 1][Solution[0] - 1]
+    return tour_costs(tour_order(Solution)[np.newaxis], DistanceMatrix)[0]
+
+def ObjFun_batch(Solutions, DistanceMatrix):
+    """
+    ObjFun_batch (function)
+        Input: Matrix of permutation vectors (one tour per
+        row, e.g. a multi-start population) and distance
+        matrix.
+        Output: Vector with the objective value of each tour.
+        Description: Gathers every edge cost at once and adds
+        them in tour order (cumulative sum), so each value is
+        exactly the sequential sum of its edges.
+    """
+    return tour_costs(np.asarray(Solutions) - 1, DistanceMatrix)
+
+def tour_costs(Orders, DistanceMatrix):
+    """
+    tour_costs (function)
+        Input: Matrix of 0-based tours (one per row) and distance
+        matrix.
+        Output: Vector with the cost of each tour.
+    """
+    Costs = DistanceMatrix[Orders, np.roll(Orders, -1, axis=1)]
+    return np.cumsum(Costs, axis=1, dtype=cost_dtype(DistanceMatrix))[:, -1]
 
-def first_solution(AmountNodes):
+def first_solution(AmountNodes, rng=None):
     """
     first_solution (function)
-        Input: Number of nodes.
+        Input: Number of nodes and optionally a random generator
+        (np.random.Generator; the global np.random if None).
         Output: Permutation vector.
         Description: Generates first solution.
     """
     # Random permutation node.
-    return np.random.permutation(np.arange(1, AmountNodes + 1))
+    return (rng or np.random).permutation(np.arange(1, AmountNodes + 1))
 
 def two_opt_swap(Solution, i, j, DistanceMatrix):
     """
@@ -55,114 +117,440 @@ def two_opt_swap(Solution, i, j, DistanceMatrix):
     cost_change = after_swap - before_swap
     return new_solution, cost_change
 
-def get_neighbors_2opt(Solution, DistanceMatrix):
-    neighbors = []
-    n = len(Solution)
-    for i in range(n - 1):
-        for j in range(i + 1, n):
-            if j - i == 1:  # Cambiar sólo si i y j no son adyacentes
-                continue
-            if j == n - 1:  # Evitar el último índice para j
-                neighbor, cost_change = two_opt_swap(Solution, i, j, DistanceMatrix)
-                neighbors.append((neighbor, cost_change))
-            else:  # Aquí j puede ser el penúltimo índice
-                neighbor, cost_change = two_opt_swap(Solution, i, j, DistanceMatrix)
-                neighbors.append((neighbor, cost_change))
-    return neighbors
-
-def best_neighbor(Neighborhood, TabuList, CurrentCost):
-    Best = None
-    Best_f = float('inf')
-
-    for candidate, cost_change in Neighborhood:
-        Candidate_f = CurrentCost + cost_change
-
-        if Candidate_f < Best_f and tuple(candidate) not in TabuList:
-            Best = candidate
-            Best_f = Candidate_f
-            
-            # Rompe el ciclo si encuentras un vecino mejor
-            if Best_f == 0:  
-                break  
-    return Best, Best_f
+def two_opt_moves(AmountNodes):
+    """
+    two_opt_moves (function)
+        Input: Number of nodes.
+        Output: Index vectors I and J of every 2-opt move.
+        Description: Enumerates the moves (i, j) with j >= i + 2
+        in the same order as the classic double loop over i and j,
+        so the k-th delta is the k-th neighbor of the old list.
+    """
+    return _two_opt_moves(int(AmountNodes))
+
+@lru_cache(maxsize=8)
+def _two_opt_moves(AmountNodes):
+    I, J = np.triu_indices(AmountNodes, k=2)
+    I.flags.writeable = False
+    J.flags.writeable = False
+    return I, J
+
+def two_opt_deltas(Solution, DistanceMatrix, I, J):
+    """
+    two_opt_deltas (function)
+        Input: Solution, DistanceMatrix and the move vectors I, J.
+        Output: Vector with the change in the objective function
+        of every move.
+        Description: Evaluates all 2-opt moves at once from the
+        four edges each one removes and adds, without building
+        the neighbor tours.
+    """
+    Tour = tour_order(Solution)
+    n = len(Tour)
+    A = Tour[I - 1]
+    B = Tour[I]
+    C = Tour[J]
+    D = Tour[(J + 1) % n]
+    Acc = cost_dtype(DistanceMatrix)
+    Delta = (DistanceMatrix[A, C].astype(Acc) + DistanceMatrix[B, D]) - \
+            (DistanceMatrix[A, B].astype(Acc) + DistanceMatrix[C, D])
+
+    # Reversing n - 1 or n positions (j - i >= n - 2) gives the same cycle.
+    Delta[J - I >= n - 2] = 0
+    return Delta
+
+def apply_two_opt(Solution, i, j):
+    """
+    apply_two_opt (function)
+        Input: Solution and the move indices i and j.
+        Output: Solution after the move.
+        Description: A Tour is changed in place with the positions
+        i..j reversed, exactly as the slice of a permutation vector
+        (so ties between moves are broken as with the vector); a
+        TwoLevelTour is changed in place too (two_opt, reversing the
+        shorter side of the cycle); a permutation vector is copied
+        with the segment between i and j reversed.
+    """
+    if isinstance(Solution, Tour):
+        Solution.reverse_positions(int(i), int(j), Shorter=False)
+        return Solution
+    if isinstance(Solution, TwoLevelTour):
+        Order = tour_order(Solution)
+        Solution.two_opt(int(Order[i - 1]), int(Order[j]))
+        return Solution
+    new_solution = np.copy(Solution)
+    new_solution[i:j+1] = new_solution[i:j+1][::-1]
+    return new_solution
+
+def get_neighbors_2opt(Solution, DistanceMatrix, Candidates=None):
+    """
+    get_neighbors_2opt (function)
+        Input: Solution, DistanceMatrix and optionally the
+        candidate lists (n x k).
+        Output: Neighborhood as the tuple (I, J, Delta).
+        Description: 2-opt neighborhood described by its moves
+        and their cost changes. With candidate lists only the
+        moves that add a candidate edge are generated. Tours are
+        only built for the move that gets chosen (see best_neighbor).
+    """
+    if Candidates is None:
+        I, J = two_opt_moves(len(Solution))
+    else:
+        I, J = candidate_moves(Solution, Candidates)
+    return I, J, two_opt_deltas(Solution, DistanceMatrix, I, J)
+
+########## Neighborhood cache ##########
+
+def _ranges(Start, Count):
+    # Concatenation of the integer ranges [Start, Start + Count).
+    Count = np.maximum(Count, 0)
+    return np.repeat(Start - np.cumsum(Count) + Count, Count) + np.arange(Count.sum())
+
+class NeighborhoodCache:
+    """
+    NeighborhoodCache (class)
+        Input: DistanceMatrix.
+        Description: Full 2-opt neighborhood (same moves, order and
+        deltas as get_neighbors_2opt) kept between iterations.
+        After the move (i, j) (the positions i..j reversed in
+        place, reported with moved) only the moves that touch the
+        segment change: the ones inside it are the mirrored moves
+        of the old table (symmetric matrix) and only the moves
+        that cross its ends are recomputed, O(n (j - i)) instead
+        of O(n^2). Any other change of the tour must be reported
+        with clear; it, or a reversal that touches most of the
+        table, rebuilds it.
+    """
+    # Below this size a rebuild costs less than the bookkeeping.
+    MinNodes = 128
+
+    def __init__(self, DistanceMatrix):
+        self.DistanceMatrix = DistanceMatrix
+        self.Symmetric = not isinstance(DistanceMatrix, np.ndarray) or \
+            np.array_equal(DistanceMatrix, DistanceMatrix.T)
+        self.Delta = None
+        self.Move = None
+
+    def moved(self, i, j):
+        """
+        moved (method)
+            Input: Move (i, j) just applied to the cached solution
+            (positions i..j reversed, the rest unchanged).
+        """
+        if self.Move is not None:
+            self.Delta = None
+        self.Move = (int(i), int(j))
+
+    def clear(self):
+        """
+        clear (method)
+            Description: The solution changed in another way; the
+            next call rebuilds the table.
+        """
+        self.Delta = None
+        self.Move = None
+
+    def neighborhood(self, Solution):
+        """
+        neighborhood (method)
+            Input: Solution (a Tour or permutation vector).
+            Output: Neighborhood as the tuple (I, J, Delta); Delta
+            is read only and valid until the next call.
+        """
+        n = len(Solution)
+        I, J = two_opt_moves(n)
+        if self.Delta is None or len(self.Delta) != len(I) or n < self.MinNodes:
+            self.Delta = two_opt_deltas(Solution, self.DistanceMatrix, I, J)
+        elif self.Move is not None:
+            i, j = self.Move
+            L = j - i
+            if L * (n - L) + 3 * n < len(I) // 2:
+                self._reverse(Solution, i, j)
+            else:
+                self.Delta = two_opt_deltas(Solution, self.DistanceMatrix, I, J)
+        self.Move = None
+
+        Delta = self.Delta.view()
+        Delta.flags.writeable = False
+        return I, J, Delta
+
+    def _reverse(self, Solution, i, j):
+        # Updates the table after the positions [i, j] of Solution were reversed.
+        n = len(Solution)
+        I, J = two_opt_moves(n)
+        P = np.arange(n - 2)
+        Offset = P * (n - 2) - P * (P - 1) // 2
+
+        def flat(Rows, Lo, Hi):
+            # Moves (p, q) with p in Rows and Lo <= q <= Hi.
+            Rows = np.asarray(Rows, dtype=np.int64)
+            Rows = Rows[(Rows >= 0) & (Rows < n - 2)]
+            Lo = np.maximum(Lo, Rows + 2)
+            return _ranges(Offset[Rows] + Lo - Rows - 2, Hi - Lo + 1)
+
+        # Moves inside the segment: (p, q) is (i + j - q, i + j - p) reversed.
+        Inside = np.arange(i + 1, j)
+        Mirror = flat(Inside, 0, j - 1) if self.Symmetric else np.empty(0, dtype=np.int64)
+
+        # Moves that use a position of the segment and one outside it.
+        Fresh = [flat([i, j, j + 1], 0, n - 1),
+                 flat(np.arange(0, i), i - 1, j),
+                 flat(Inside, j, n - 1)]
+        if not self.Symmetric:
+            Fresh.append(flat(Inside, 0, j - 1))
+        if j == n - 1:
+            Fresh.append(flat([0], 0, n - 1))   # p = 0 uses position n - 1
+        if i == 0:
+            Fresh.append(flat(np.arange(n - 2), n - 1, n - 1))   # q = n - 1 uses position 0
+        Fresh = np.concatenate(Fresh)
+
+        if len(Mirror):
+            Q, R = J[Mirror], I[Mirror]
+            Source = Offset[i + j - Q] + Q - R - 2
+            self.Delta[Mirror] = self.Delta[Source]
+        self.Delta[Fresh] = two_opt_deltas(Solution, self.DistanceMatrix, I[Fresh], J[Fresh])
+
+def best_neighbor(Solution, Neighborhood, TabuMemory, Iteration, CurrentCost,
+                  BestCost, Limit=None):
+    """
+    best_neighbor (function)
+        Input: Current solution, neighborhood (I, J, Delta), tabu
+        memory, current iteration, current cost, best cost found
+        and optionally the number of moves that may be evaluated.
+        Output: Cost of the best admissible neighbor and its move
+        (i, j) (infinity and None if there is none).
+        Description: Picks the best move that is not tabu or
+        satisfies the aspiration criterion (ties in neighborhood
+        order). The neighbor is not built: the caller applies the
+        move to its tour in place.
+    """
+    I, J, Delta = Neighborhood
+    if Limit is not None:
+        I, J, Delta = I[:Limit], J[:Limit], Delta[:Limit]
+
+    # Reversing n - 1 or n positions leaves the same cycle: not a real move.
+    Admissible = admissible_moves(TabuMemory, Solution, I, J, Delta, Iteration,
+                                  CurrentCost, BestCost)
+    Admissible &= J - I < len(Solution) - 2
+    if not Admissible.any():
+        return float('inf'), None
+
+    k = int(np.argmin(np.where(Admissible, Delta, np.inf)))
+    return CurrentCost + Delta[k], (I[k], J[k])
 
 def TabuSearch(DistanceMatrix, AmountNodes, MaxOFcalls=100, TabuSize=10, 
-                   minErrorInten=0.001):
+                   minErrorInten=0.001, Candidates=None, UseLocalSearch=False, rng=None,
+                   InitialSolution=None, InitialStrategy='random', TimeLimit=None,
+                   Optimal=None, TargetGap=0.0, Callback=None, Trace=None, Checkpoint=None,
+                   CheckpointEvery=1000, Resume=False, Counter=None, Migration=None):
     """
     TabuSearch_Con (function)
         Input: Distance Matrix (TSP instance), Total number of
         nodes, Max number of calls to the objective function, size of
-        tabu list, minimal error for intensification and amount
-        of solutions for intensification.
-        Output: Unique solutions (Best found).
+        tabu list (tenure, in iterations, of the removed edges),
+        minimal error for intensification and amount of solutions
+        for intensification. Candidates restricts the 2-opt
+        neighborhood to candidate edges: a number k of nearest
+        neighbors or an (n x k) array of candidate lists.
+        UseLocalSearch polishes the first solution, every restart
+        and every new best solution with the 2-opt/Or-opt descent
+        of LocalSearch (its move evaluations count as calls).
+        rng is the random generator of the run (global np.random
+        if None). InitialSolution is the first solution
+        (permutation vector, Tour or TwoLevelTour, copied into the
+        0-based Tour that the search changes in place); if None it is
+        built with InitialStrategy, a name of
+        Construction.STRATEGIES ('random', 'nearest_neighbor',
+        'greedy', 'hilbert', 'mst', 'insertion') or a function of
+        (DistanceMatrix, rng). Diversification restarts use it too
+        when it is randomized (restart_solution).
+        The run also stops after TimeLimit seconds, when the gap to
+        a known Optimal reaches TargetGap, or when
+        Callback(calls, BestSolution, BestCost), called once per
+        iteration with the best so far (and once at the end),
+        returns True (StopCriteria).
+        Trace receives (calls, best cost, neighbor cost) every
+        iteration (Trace.py; MemoryTrace if None).
+        Checkpoint is a file where the whole search state (tours,
+        costs, tabu memory, calls, RNG state and history) is saved
+        every CheckpointEvery iterations and at the end; with
+        Resume the run continues from it, bit for bit, when it
+        exists (same arguments; the time limit restarts). A
+        streaming Trace continues its file when it is created
+        with Resume=True (CsvTrace, NdjsonTrace).
+        Counter is the Budget (Instrumentation.py) that counts the
+        calls of the run, full and delta evaluations apart, and
+        times its sections when created with Timers=True; pass one
+        to read them after the run.
+        Migration is called once per iteration as
+        Migration.exchange(BestSolution, BestCost); when it returns
+        a (solution, cost) pair, that tour becomes the current and
+        best solution (island model, Islands.Exchange).
+        Output: Neighbor and best costs of every iteration (the
+        lists of a MemoryTrace; only the last ones for other
+        traces).
         Description: Implementation of Tabu Search with 2-opt
-        for TSP, recording results at each iteration.
+        for TSP, recording results at each iteration. DistanceMatrix
+        may also be a DistanceOracle (large instances); the
+        neighborhood is then always restricted to candidate edges
+        (8 nearest neighbors when Candidates is None).
     """ 
     # Setting initial variables
-    BestSolution = first_solution(AmountNodes)
-    CurrentSolution = copy.deepcopy(BestSolution)
+    Stop = StopCriteria(TimeLimit, Optimal, TargetGap, Callback)
+    Candidates = solver_candidates(Candidates, DistanceMatrix)
+    SearchCandidates = Candidates if Candidates is not None else ORACLE_CANDIDATES
+    if UseLocalSearch:
+        SearchCandidates = candidate_lists(SearchCandidates, DistanceMatrix)
+    Counter = Budget() if Counter is None else Counter
+    if InitialSolution is None:
+        InitialSolution = initial_solution(InitialStrategy, DistanceMatrix, rng)
+    CurrentSolution = Tour(InitialSolution)  # Own copy, changed in place by every move
+    Counter.count_full()
+    if UseLocalSearch:
+        with Counter.timer('local_search'):
+            _, evaluations, _ = local_search(CurrentSolution, DistanceMatrix, SearchCandidates)
+        Counter.count_delta(evaluations)
     CurrentCost = ObjFun(CurrentSolution, DistanceMatrix)
-    tabu_list = set()
-    bests_n = []
-    best_sol = []
-    calls = 1
-
-    # Main loop (stop criteria: MaxOFcalls)
-    while calls < MaxOFcalls:
-        # Creating Neighborhood with 2-opt swaps
-        Neighborhood = get_neighbors_2opt(CurrentSolution, DistanceMatrix)
-
-        # Count the number of neighborhood calls
-        Aux_calls = calls
-        calls = calls + (AmountNodes-1)*(AmountNodes-2)//2
-
-        # If MaxOFcalls is exceeded, stop
-        if MaxOFcalls < calls:
-            n = MaxOFcalls - Aux_calls
-            BestNeighbor, BestNeighbor_f = best_neighbor(Neighborhood[:n], tabu_list, CurrentCost)
-        else:
-            BestNeighbor, BestNeighbor_f = best_neighbor(Neighborhood, tabu_list, CurrentCost)
+    BestSolution = CurrentSolution.copy()
+    BestCost = CurrentCost
+    tabu_memory = new_tabu_memory(AmountNodes, not isinstance(DistanceMatrix, np.ndarray))
+    Neighborhoods = NeighborhoodCache(DistanceMatrix) if Candidates is None else None
+    iteration = 0
+    Trace = MemoryTrace() if Trace is None else Trace
+    Recorded = None  # Neighbor cost of the last trace record
+
+    def move(i, j):
+        # Applies the move (i, j) to CurrentSolution in place (positions i..j
+        # reversed, so the cached table, indexed by position, stays valid).
+        apply_two_opt(CurrentSolution, i, j)
+        if Neighborhoods is not None:
+            Neighborhoods.moved(i, j)
+
+    def save():
+        State = {'current': np.asarray(CurrentSolution), 'current_cost': CurrentCost,
+                 'best': np.asarray(BestSolution), 'best_cost': BestCost,
+                 'counters': np.array([Counter.calls, iteration, Loops]),
+                 'last_neighbor_cost': np.array([] if Recorded is None else [Recorded])}
+        State.update(pack_rng(rng), **pack_matrix('tabu', tabu_memory), **Counter.get_state())
+        if hasattr(Trace, 'get_state'):
+            State.update(Trace.get_state())
+        save_checkpoint(Checkpoint, State)
+
+    # Continue a saved run
+    Loops = 0
+    State = load_checkpoint(Checkpoint) if Resume and Checkpoint is not None else None
+    if State is not None:
+        CurrentSolution, CurrentCost = Tour(State['current']), State['current_cost'][()]
+        BestSolution, BestCost = Tour(State['best']), State['best_cost'][()]
+        _, iteration, Loops = (int(x) for x in State['counters'])
+        Counter.set_state(State)
+        if len(State['last_neighbor_cost']):
+            Recorded = State['last_neighbor_cost'][0]
+        unpack_rng(rng, State)
+        tabu_memory = unpack_matrix('tabu', tabu_memory, State)
+        if hasattr(Trace, 'set_state'):
+            Trace.set_state(State)
+
+    # Main loop (stop criteria: MaxOFcalls, time, target gap or callback)
+    while Counter.calls < MaxOFcalls and not Stop.stop(Counter.calls, BestSolution, BestCost):
+        if Checkpoint is not None and Loops and Loops % CheckpointEvery == 0:
+            with Counter.timer('bookkeeping'):
+                save()
+        Loops = Loops + 1
+
+        # Adopt a better tour from another island (tabu memory is kept)
+        if Migration is not None:
+            Migrant = Migration.exchange(BestSolution, BestCost)
+            if Migrant is not None:
+                CurrentSolution, CurrentCost = Tour(Migrant[0]), Migrant[1]
+                BestSolution, BestCost = CurrentSolution.copy(), CurrentCost
+                if Neighborhoods is not None:
+                    Neighborhoods.clear()
+
+        # Creating Neighborhood with 2-opt swaps (updated in place after a move)
+        with Counter.timer('neighborhood'):
+            if Neighborhoods is None:
+                Neighborhood = get_neighbors_2opt(CurrentSolution, DistanceMatrix, Candidates)
+            else:
+                Neighborhood = Neighborhoods.neighborhood(CurrentSolution)
+
+        # Count the number of neighborhood calls (delta evaluations)
+        Aux_calls = Counter.calls
+        Counter.count_delta(len(Neighborhood[2]))
+
+        # If MaxOFcalls is exceeded, only the first moves are evaluated
+        Limit = None
+        if MaxOFcalls < Counter.calls:
+            Limit = MaxOFcalls - Aux_calls
+        with Counter.timer('selection'):
+            BestNeighbor_f, Move = best_neighbor(CurrentSolution, Neighborhood, tabu_memory,
+                                                 iteration, CurrentCost, BestCost, Limit)
 
         # Check intensification criteria: Minimal improvement
         if abs(BestNeighbor_f - CurrentCost) < minErrorInten:
-            Neighborhood = get_neighbors_2opt(CurrentSolution, DistanceMatrix)
-            CurrentSolution, CurrentCost = best_neighbor(Neighborhood, tabu_list, CurrentCost)
-            if MaxOFcalls < calls:
-                n = MaxOFcalls - Aux_calls
-                BestNeighbor, BestNeighbor_f = best_neighbor(Neighborhood[:n], tabu_list, CurrentCost)
-            else:
-                BestNeighbor, BestNeighbor_f = best_neighbor(Neighborhood, tabu_list, CurrentCost)
-            calls = calls + (AmountNodes-1)*(AmountNodes-2)//2
+            # The neighborhood of CurrentSolution is already known
+            with Counter.timer('selection'):
+                Intensified_f, Move = best_neighbor(CurrentSolution, Neighborhood, tabu_memory,
+                                                    iteration, CurrentCost, BestCost)
+            with Counter.timer('bookkeeping'):
+                make_tabu(tabu_memory, CurrentSolution, Move[0], Move[1], iteration, TabuSize)
+                move(*Move)
+            iteration = iteration + 1
+            CurrentCost = Intensified_f
+            Counter.count_delta(len(Neighborhood[2]))
+            Counter.count_move()
             continue
 
-        # Check diversification criteria: No improvement (BestNeighbor is None)
-        if BestNeighbor is None:
-            CurrentSolution = first_solution(AmountNodes)
+        # Check diversification criteria: No improvement (no admissible move)
+        if Move is None:
+            CurrentSolution = Tour(restart_solution(InitialStrategy, DistanceMatrix, rng))
+            if UseLocalSearch:
+                with Counter.timer('local_search'):
+                    _, evaluations, _ = local_search(CurrentSolution, DistanceMatrix,
+                                                  SearchCandidates)
+                Counter.count_delta(evaluations)
+            if Neighborhoods is not None:
+                Neighborhoods.clear()
             CurrentCost = ObjFun(CurrentSolution, DistanceMatrix)
-            calls = calls + 1
+            Counter.count_full()
+            Counter.count_iteration()
             continue
 
-        # Add current solution to the tabu list and move to the new neighbor
-        tabu_list.add(tuple(CurrentSolution.tolist()))
-        CurrentSolution = copy.deepcopy(BestNeighbor)
-        CurrentCost = copy.deepcopy(BestNeighbor_f)
-
-
-        if len(tabu_list) >= TabuSize:
-            tabu_list = set(list(tabu_list)[-TabuSize:])
-        tabu_list.add(tuple(CurrentSolution))
-
+        # Forbid the removed edges for TabuSize iterations and move to the neighbor
+        with Counter.timer('bookkeeping'):
+            make_tabu(tabu_memory, CurrentSolution, Move[0], Move[1], iteration, TabuSize)
+            move(*Move)
+        iteration = iteration + 1
+        CurrentCost = BestNeighbor_f
+        Counter.count_move()
 
         # Update best solution if a better one is found
-        if BestNeighbor_f < ObjFun(BestSolution, DistanceMatrix):
-            BestSolution = copy.deepcopy(BestNeighbor)
-            calls = calls+1
+        if BestNeighbor_f < BestCost:
+            if UseLocalSearch:
+                with Counter.timer('local_search'):
+                    _, evaluations, _ = local_search(CurrentSolution, DistanceMatrix,
+                                                  SearchCandidates)
+                if Neighborhoods is not None:
+                    Neighborhoods.clear()
+                CurrentCost = ObjFun(CurrentSolution, DistanceMatrix)
+                Counter.count_delta(evaluations)
+            BestSolution = CurrentSolution.copy()
+            BestCost = CurrentCost
+            Counter.count_full()
 
-        # Record the current best solution and neighbor costs
-        best_sol.append(ObjFun(BestSolution, DistanceMatrix))
-        bests_n.append(ObjFun(BestNeighbor, DistanceMatrix))
-        calls = calls+2
+        # Record the best and neighbor costs (already known, not re-evaluated)
+        with Counter.timer('bookkeeping'):
+            Trace.record(Counter.calls, BestCost, BestNeighbor_f)
+        Recorded = BestNeighbor_f
 
-    # Return the best solution found along with the progress data
-    return bests_n, best_sol
+    # Nothing recorded (stopped before the first iteration, or every iteration
+    # intensified or restarted): record the current solution
+    if Recorded is None:
+        Recorded = CurrentCost
+        Trace.record(Counter.calls, BestCost, Recorded)
+    Stop.finish(Counter.calls, BestSolution, BestCost)
+    if Checkpoint is not None:
+        save()
 
+    # Return the best solution found along with the progress data
+    return trace_result(Trace, Recorded, BestCost)
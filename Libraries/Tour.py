@@ -0,0 +1,345 @@
+########## Libraries ##########
+import numpy as np
+from math import isqrt
+
+########## Classes ##########
+
+class Tour:
+    """
+    Tour (class)
+        Input: Permutation vector (1-based cities, as everywhere
+        else) or another tour.
+        Description: Cycle stored as the 0-based int32 array order
+        and its inverse pos (pos[order[k]] = k), so next, prev and
+        between are O(1). Cities in the methods are 0-based
+        (rows of the distance matrix). A reversal is applied in
+        place on whichever side of the cycle is shorter. np.asarray
+        gives back the 1-based permutation vector, so a tour can
+        be passed wherever a solution is expected.
+    """
+    __slots__ = ('order', 'pos')
+
+    def __init__(self, Solution):
+        self.order = np.array(tour_order(Solution), dtype=np.int32)
+        self.pos = np.empty(len(self.order), dtype=np.int32)
+        self.pos[self.order] = np.arange(len(self.order), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __array__(self, dtype=None, copy=None):
+        return (self.order.astype(np.int64) + 1).astype(dtype or np.int64, copy=False)
+
+    def copy(self):
+        """
+        copy (method)
+            Output: Independent copy of the tour.
+        """
+        return Tour(self)
+
+    def next(self, c):
+        """
+        next (method)
+            Input: City c.
+            Output: City after c.
+        """
+        return int(self.order[(self.pos[c] + 1) % len(self.order)])
+
+    def prev(self, c):
+        """
+        prev (method)
+            Input: City c.
+            Output: City before c.
+        """
+        return int(self.order[self.pos[c] - 1])
+
+    def between(self, a, b, c):
+        """
+        between (method)
+            Input: Cities a, b and c.
+            Output: True if b is on the forward path from a to c.
+        """
+        i, j, k = self.pos[a], self.pos[b], self.pos[c]
+        if i <= k:
+            return bool(i <= j <= k)
+        return bool(j >= i or j <= k)
+
+    def reverse(self, a, c):
+        """
+        reverse (method)
+            Input: Cities a and c.
+            Description: Reverses the forward path from a to c
+            (the complement instead when it is shorter: same
+            cycle, opposite orientation).
+        """
+        self.reverse_positions(int(self.pos[a]), int(self.pos[c]))
+
+    def reverse_positions(self, i, j, Shorter=True):
+        """
+        reverse_positions (method)
+            Input: Positions i and j and whether the shorter side
+            may be reversed instead.
+            Description: reverse of the forward path from position
+            i to position j. With Shorter=False the positions i..j
+            themselves are reversed and every other city keeps its
+            position, as in a reversed slice of the permutation
+            vector (move tables indexed by position stay valid).
+        """
+        order, pos = self.order, self.pos
+        n = len(order)
+        L = (j - i) % n + 1
+        if Shorter and 2 * L > n:
+            i, j, L = (j + 1) % n, (i - 1) % n, n - L
+        idx = (i + np.arange(L)) % n
+        order[idx] = order[idx[::-1]]
+        pos[order[idx]] = idx
+
+    def two_opt(self, a, c):
+        """
+        two_opt (method)
+            Input: Cities a and c.
+            Description: Replaces the edges (a, next a) and
+            (c, next c) by (a, c) and (next a, next c).
+        """
+        self.reverse(self.next(a), c)
+
+    def move_segment(self, a, e, c, Reversed):
+        """
+        move_segment (method)
+            Input: First and last cities of the forward path a..e,
+            city c outside it and whether the path is reversed.
+            Description: Moves the path between c and its successor.
+        """
+        order, pos = self.order, self.pos
+        n = len(order)
+        L = (pos[e] - pos[a]) % n + 1
+        Segment = order[(pos[a] + np.arange(L)) % n]
+        if Reversed:
+            Segment = Segment[::-1]
+        Rest = np.roll(order, -(pos[e] + 1))[:n - L]
+        k = int(np.flatnonzero(Rest == c)[0]) + 1
+        order[:] = np.concatenate((Rest[:k], Segment, Rest[k:]))
+        pos[order] = np.arange(n, dtype=np.int32)
+
+class TwoLevelTour:
+    """
+    TwoLevelTour (class)
+        Input: Permutation vector (1-based cities) or another tour.
+        Description: Two-level doubly-linked list for very large
+        instances: the cycle is a circular sequence of about
+        sqrt(n) blocks of cities, each with a reverse bit. A
+        reversal splits at most two blocks and then reverses the
+        blocks in between by flipping their bits, O(sqrt(n))
+        instead of O(n). Same methods as Tour; order is built
+        on demand.
+    """
+    __slots__ = ('n', 'GroupSize', 'block', 'index', 'cities', 'rev', 'rank', 'sequence')
+
+    def __init__(self, Solution):
+        Order = tour_order(Solution)
+        self.n = len(Order)
+        self.GroupSize = max(isqrt(self.n), 8)
+        self._build([int(c) for c in Order])
+
+    def _build(self, Order):
+        # Splits the cycle into blocks of GroupSize cities.
+        self.block = [0] * self.n
+        self.index = [0] * self.n
+        self.cities = []
+        self.rev = []
+        for b, Start in enumerate(range(0, self.n, self.GroupSize)):
+            Cities = Order[Start:Start + self.GroupSize]
+            for k, c in enumerate(Cities):
+                self.block[c] = b
+                self.index[c] = k
+            self.cities.append(Cities)
+            self.rev.append(False)
+        self.sequence = list(range(len(self.cities)))
+        self.rank = list(range(len(self.cities)))
+
+    def __len__(self):
+        return self.n
+
+    def __array__(self, dtype=None, copy=None):
+        return (self.order.astype(np.int64) + 1).astype(dtype or np.int64, copy=False)
+
+    @property
+    def order(self):
+        """
+        order (property)
+            Output: 0-based int32 array of the cities in tour order.
+        """
+        Order = []
+        for b in self.sequence:
+            Order.extend(self.cities[b][::-1] if self.rev[b] else self.cities[b])
+        return np.array(Order, dtype=np.int32)
+
+    def copy(self):
+        """
+        copy (method)
+            Output: Independent copy of the tour.
+        """
+        return TwoLevelTour(self)
+
+    def _first(self, b):
+        return self.cities[b][-1] if self.rev[b] else self.cities[b][0]
+
+    def _last(self, b):
+        return self.cities[b][0] if self.rev[b] else self.cities[b][-1]
+
+    def next(self, c):
+        """
+        next (method)
+            Input: City c.
+            Output: City after c.
+        """
+        b, k = self.block[c], self.index[c]
+        Cities = self.cities[b]
+        k = k - 1 if self.rev[b] else k + 1
+        if 0 <= k < len(Cities):
+            return Cities[k]
+        return self._first(self.sequence[(self.rank[b] + 1) % len(self.sequence)])
+
+    def prev(self, c):
+        """
+        prev (method)
+            Input: City c.
+            Output: City before c.
+        """
+        b, k = self.block[c], self.index[c]
+        Cities = self.cities[b]
+        k = k + 1 if self.rev[b] else k - 1
+        if 0 <= k < len(Cities):
+            return Cities[k]
+        return self._last(self.sequence[self.rank[b] - 1])
+
+    def _key(self, c):
+        # Position of c in the cycle as (rank of its block, index in it).
+        b = self.block[c]
+        k = self.index[c]
+        return self.rank[b], (len(self.cities[b]) - 1 - k if self.rev[b] else k)
+
+    def between(self, a, b, c):
+        """
+        between (method)
+            Input: Cities a, b and c.
+            Output: True if b is on the forward path from a to c.
+        """
+        i, j, k = self._key(a), self._key(b), self._key(c)
+        if i <= k:
+            return i <= j <= k
+        return j >= i or j <= k
+
+    def _split(self, c):
+        # Makes c the first city (in tour order) of its block.
+        b = self.block[c]
+        Cities = self.cities[b]
+        k = self.index[c]
+        if self.rev[b]:
+            if k == len(Cities) - 1:
+                return
+            Before, After = Cities[k + 1:], Cities[:k + 1]
+        else:
+            if k == 0:
+                return
+            Before, After = Cities[:k], Cities[k:]
+        New = len(self.cities)
+        self.cities[b] = Before
+        self.cities.append(After)
+        self.rev.append(self.rev[b])
+        for Block, Part in ((b, Before), (New, After)):
+            for k, City in enumerate(Part):
+                self.block[City] = Block
+                self.index[City] = k
+        self.sequence.insert(self.rank[b] + 1, New)
+        self.rank.append(0)
+        for r in range(self.rank[b] + 1, len(self.sequence)):
+            self.rank[self.sequence[r]] = r
+
+    def reverse(self, a, c):
+        """
+        reverse (method)
+            Input: Cities a and c.
+            Description: Reverses the forward path from a to c:
+            splits the blocks at both ends and reverses the run of
+            blocks (or the complementary run when it is shorter).
+            The blocks are rebuilt when splits double their number.
+        """
+        if a == c or self.next(c) == a:
+            return
+        self._split(a)
+        self._split(self.next(c))
+        m = len(self.sequence)
+        First, Last = self.rank[self.block[a]], self.rank[self.block[c]]
+        L = (Last - First) % m + 1
+        if 2 * L > m:
+            First, L = (Last + 1) % m, m - L
+        Ranks = [(First + t) % m for t in range(L)]
+        Blocks = [self.sequence[r] for r in Ranks]
+        for r, b in zip(Ranks, reversed(Blocks)):
+            self.sequence[r] = b
+            self.rank[b] = r
+            self.rev[b] = not self.rev[b]
+        if m > 2 * (self.n // self.GroupSize + 1):
+            self._build(list(self.order))
+
+    def two_opt(self, a, c):
+        """
+        two_opt (method)
+            Input: Cities a and c.
+            Description: Replaces the edges (a, next a) and
+            (c, next c) by (a, c) and (next a, next c).
+        """
+        self.reverse(self.next(a), c)
+
+    def move_segment(self, a, e, c, Reversed):
+        """
+        move_segment (method)
+            Input: First and last cities of the forward path a..e,
+            city c outside it and whether the path is reversed.
+            Description: Moves the path between c and its successor
+            with two or three reversals.
+        """
+        p, nx = self.prev(a), self.next(e)
+        # p a..e nx .. c c2  ->  p c .. nx e..a c2
+        self.reverse(a, c)
+        if nx != c:
+            # -> p nx .. c e..a c2
+            if self.next(p) == c:
+                self.reverse(c, nx)
+            else:
+                self.reverse(nx, c)
+        if not Reversed:
+            # -> p nx .. c a..e c2
+            if self.next(c) == e:
+                self.reverse(e, a)
+            else:
+                self.reverse(a, e)
+
+########## Functions ##########
+
+def tour_order(Solution):
+    """
+    tour_order (function)
+        Input: Permutation vector (1-based) or tour.
+        Output: 0-based array of the cities in tour order.
+        Description: Lets every function take either form.
+    """
+    if isinstance(Solution, (Tour, TwoLevelTour)):
+        return Solution.order
+    return np.asarray(Solution) - 1
+
+def tour_positions(Solution):
+    """
+    tour_positions (function)
+        Input: Permutation vector (1-based) or tour.
+        Output: Position of every city (0-based) in the tour.
+        Description: The pos array of a Tour without copying it;
+        built in O(n) otherwise.
+    """
+    if isinstance(Solution, Tour):
+        return Solution.pos
+    Order = tour_order(Solution)
+    Pos = np.empty(len(Order), dtype=np.int64)
+    Pos[Order] = np.arange(len(Order))
+    return Pos
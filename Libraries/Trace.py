@@ -0,0 +1,250 @@
+########## Libraries ##########
+import numpy as np
+import csv
+import json
+
+########## Classes ##########
+
+class MemoryTrace:
+    """
+    MemoryTrace (class)
+        Description: Keeps the whole history in the lists bests_n
+        (cost of each iteration's neighbor) and best_sol (best
+        cost so far), as the solvers always returned it.
+    """
+    def __init__(self):
+        self.bests_n = []
+        self.best_sol = []
+
+    def record(self, calls, BestCost, NeighborCost):
+        """
+        record (method)
+            Input: Calls so far, best cost and cost of the
+            iteration's neighbor.
+            Description: Receives one event per iteration.
+        """
+        self.best_sol.append(BestCost)
+        self.bests_n.append(NeighborCost)
+
+    def close(self):
+        """
+        close (method)
+            Description: Nothing to release.
+        """
+
+    def get_state(self):
+        """
+        get_state (method)
+            Output: Dictionary of arrays with the history (for
+            checkpoints).
+        """
+        return {'trace_bests_n': np.array(self.bests_n), 'trace_best_sol': np.array(self.best_sol)}
+
+    def set_state(self, State):
+        """
+        set_state (method)
+            Input: Checkpoint.
+            Description: Restores the history saved by get_state.
+        """
+        self.bests_n = list(State['trace_bests_n'])
+        self.best_sol = list(State['trace_best_sol'])
+
+class DecimatedTrace(MemoryTrace):
+    """
+    DecimatedTrace (class)
+        Input: Maximum number of points kept.
+        Description: Same lists as MemoryTrace (plus calls) in
+        constant memory: when MaxPoints are stored, every other
+        point is dropped and from then on only one event out of
+        twice as many is kept, so the points stay evenly spread
+        over the run.
+    """
+    def __init__(self, MaxPoints=1000):
+        super().__init__()
+        self.MaxPoints = max(MaxPoints, 2)
+        self.calls = []
+        self.Stride = 1
+        self.Events = 0
+
+    def record(self, calls, BestCost, NeighborCost):
+        if self.Events % self.Stride == 0:
+            self.calls.append(calls)
+            super().record(calls, BestCost, NeighborCost)
+            if len(self.calls) >= self.MaxPoints:
+                for History in (self.calls, self.best_sol, self.bests_n):
+                    del History[1::2]
+                self.Stride *= 2
+        self.Events += 1
+
+    def get_state(self):
+        State = super().get_state()
+        State.update(trace_calls=np.array(self.calls, dtype=np.int64),
+                     trace_counters=np.array([self.Stride, self.Events]))
+        return State
+
+    def set_state(self, State):
+        super().set_state(State)
+        self.calls = list(State['trace_calls'])
+        self.Stride, self.Events = (int(x) for x in State['trace_counters'])
+
+class SampledTrace:
+    """
+    SampledTrace (class)
+        Input: Trace that receives the events and sampling period.
+        Description: Forwards one event out of Every, and every
+        event that improves the best cost, to Sink.
+    """
+    def __init__(self, Sink, Every=10):
+        self.Sink = Sink
+        self.Every = Every
+        self.Events = 0
+        self.Best = None
+
+    def record(self, calls, BestCost, NeighborCost):
+        Improved = self.Best is None or BestCost < self.Best
+        if Improved or self.Events % self.Every == 0:
+            self.Sink.record(calls, BestCost, NeighborCost)
+        if Improved:
+            self.Best = BestCost
+        self.Events += 1
+
+    def close(self):
+        self.Sink.close()
+
+    def get_state(self):
+        State = self.Sink.get_state() if hasattr(self.Sink, 'get_state') else {}
+        State['trace_sampled'] = np.array([self.Events, np.nan if self.Best is None else self.Best])
+        return State
+
+    def set_state(self, State):
+        if hasattr(self.Sink, 'set_state'):
+            self.Sink.set_state(State)
+        Events, Best = State['trace_sampled']
+        self.Events = int(Events)
+        self.Best = None if np.isnan(Best) else Best
+
+class CsvTrace:
+    """
+    CsvTrace (class)
+        Input: File name or open file, known optimal value (the
+        costs are written as normalized errors if given), header,
+        number of rows between flushes and whether the run is
+        resumed from a checkpoint.
+        Description: Streams one row (best, neighbor, calls) per
+        event, so the convergence can be followed while the run
+        goes on and memory does not grow. The default header is
+        the one of the convergence files (Results/Experimentals).
+        With Resume a file name is opened in append mode and the
+        header is only written to an empty file; the checkpoint
+        keeps the number of rows and the file size, and set_state
+        cuts the rows written after the checkpoint (the resumed
+        run records them again).
+    """
+    def __init__(self, File, Optimal=None, Header=('Mejor', 'Vecinos', 'Llamadas'),
+                 FlushEvery=100, Resume=False):
+        self.Own = isinstance(File, str)
+        self.File = open(File, 'a' if Resume else 'w', newline='') if self.Own else File
+        self.Writer = csv.writer(self.File)
+        if not Resume or self._size() == 0:
+            self.Writer.writerow(Header)
+        self.Optimal = Optimal
+        self.FlushEvery = FlushEvery
+        self.Rows = 0
+
+    def _size(self):
+        # Current end of the file (-1 if it cannot seek, e.g. a pipe).
+        try:
+            self.File.flush()
+            return self.File.seek(0, 2)
+        except (OSError, ValueError):
+            return -1
+
+    def value(self, Cost):
+        """
+        value (method)
+            Input: Cost.
+            Output: Cost, or its normalized error if Optimal is known.
+        """
+        if self.Optimal is None:
+            return Cost
+        return (Cost - self.Optimal) / self.Optimal
+
+    def write(self, calls, BestCost, NeighborCost):
+        self.Writer.writerow([self.value(BestCost), self.value(NeighborCost), calls])
+
+    def record(self, calls, BestCost, NeighborCost):
+        self.write(calls, BestCost, NeighborCost)
+        self.Rows += 1
+        if self.Rows % self.FlushEvery == 0:
+            self.File.flush()
+
+    def close(self):
+        """
+        close (method)
+            Description: Flushes, and closes the file if the trace
+            opened it.
+        """
+        self.File.flush()
+        if self.Own:
+            self.File.close()
+
+    def get_state(self):
+        """
+        get_state (method)
+            Output: Dictionary of arrays with the rows written and
+            the file size (for checkpoints).
+        """
+        return {'trace_rows': np.array([self.Rows, self._size()], dtype=np.int64)}
+
+    def set_state(self, State):
+        """
+        set_state (method)
+            Input: Checkpoint.
+            Description: Drops the rows written after the
+            checkpoint, so the file continues exactly where the
+            saved run was.
+        """
+        self.Rows, Size = (int(x) for x in State['trace_rows'])
+        if Size >= 0 and self._size() > Size:
+            self.File.truncate(Size)
+            self.File.seek(0, 2)
+
+class NdjsonTrace(CsvTrace):
+    """
+    NdjsonTrace (class)
+        Input: File name or open file, known optimal value and
+        number of lines between flushes and whether the run is
+        resumed (see CsvTrace).
+        Description: Like CsvTrace, one JSON object per line with
+        calls, best and neighbor (and their errors if Optimal is
+        known).
+    """
+    def __init__(self, File, Optimal=None, FlushEvery=100, Resume=False):
+        self.Own = isinstance(File, str)
+        self.File = open(File, 'a' if Resume else 'w') if self.Own else File
+        self.Optimal = Optimal
+        self.FlushEvery = FlushEvery
+        self.Rows = 0
+
+    def write(self, calls, BestCost, NeighborCost):
+        # NumPy scalars to plain numbers for json.
+        Event = {'calls': int(calls), 'best': getattr(BestCost, 'item', lambda: BestCost)(),
+                 'neighbor': getattr(NeighborCost, 'item', lambda: NeighborCost)()}
+        if self.Optimal is not None:
+            Event['best_error'] = self.value(Event['best'])
+            Event['neighbor_error'] = self.value(Event['neighbor'])
+        self.File.write(json.dumps(Event) + '\n')
+
+########## Functions ##########
+
+def trace_result(Trace, NeighborCost, BestCost):
+    """
+    trace_result (function)
+        Input: Trace of the run, last neighbor cost and best cost.
+        Output: (bests_n, best_sol) returned by the solvers.
+        Description: The lists of a MemoryTrace (or DecimatedTrace),
+        or only the last values for the streaming traces.
+    """
+    if isinstance(Trace, MemoryTrace):
+        return Trace.bests_n, Trace.best_sol
+    return [NeighborCost], [BestCost]
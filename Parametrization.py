@@ -5,17 +5,50 @@ import numpy as np
 import optuna
 import json
 import csv
+from concurrent.futures import ProcessPoolExecutor
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
 
 ########## Globals ##########
 """
     Path_Instances 
         Path of TSP instances in your
+    Path_Cache
+        Directory of the cached distance matrices.
+    Matrix_dtype
+        Distance matrix type (TSPLIB rounded distances).
+    Storage_URL
+        Optuna storage shared by the worker processes.
+    N_Trials, Workers
+        Trials of each study (finished or pruned) and worker
+        processes (None uses every core).
+    Race_Configurations, Race_Stages, Seed
+        Configurations of a race, its stages as (calls, indices of
+        the instances sorted by size) and base seed of the runs.
+    Use_Racing
+        Race the configurations instead of full budget trials.
+    TS_Options, GLS_Options
+        Keyword arguments of the tuned runs of each solver. They
+        must match the runs of TabuTest.py and GLSTest.py (initial
+        strategy, Fast Local Search), so the tuned parameters fit
+        the solver setup the scripts use.
     max_calls_obj_func (global variable)
         Minimum of calls for end parametrization.
 """
 Path_Instances = "Instances/Parametrizacion"
 Path_OPT = "Optimals/Parametrizacion/Optimals.txt"
+Path_Cache = "Cache"
+Matrix_dtype = "int32"
 output_directory = 'Results/Parameters'
+Storage_URL = 'sqlite:///Results/Parameters/optuna.db'
+N_Trials = 11
+Workers = None
+Race_Configurations = 48
+Race_Stages = [(10000, [0, 1, 0, 1]), (40000, [0, 1, 2]), (80000, [0, 1, 2, 3])]
+Seed = 2024
+Use_Racing = True
+TS_Options = {'InitialStrategy': 'insertion'}
+GLS_Options = {'InitialStrategy': 'insertion', 'FastLocalSearch': False}
 best_TS_params_file = 'best_TS_params.txt'
 best_GLS_params_file = 'best_GLS_params.txt'
 trials_TS_file = 'trials_TS.csv'
@@ -25,10 +58,12 @@ trials_GLS_file = 'trials_GLS.csv'
 # Path from the workspace.
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Libraries'))
 from ReadTSP import ReadTsp # type: ignore
-from ReadTSP import ReadTSP_optTour # type: ignore
+from ReadTSP import ReadOptimals, InstanceName # type: ignore
 from TabuSearch import ObjFun  # type: ignore
 from TabuSearch import TabuSearch  # type: ignore
 from GLS import Guided_Local_Search # type: ignore
+from Parallel import run_tasks # type: ignore
+from Racing import race # type: ignore
 
 ########## Secundary functions ##########
 
@@ -46,12 +81,37 @@ def Read_Content(filenames_Ins, filenames_Opt):
 
     # Reading files.
     for file in filenames_Ins:
-        Instances.append(ReadTsp(file))
+        Instances.append(ReadTsp(file, Path_Cache, Matrix_dtype))
 
-    OPT_Instances = ReadTSP_optTour(filenames_Opt)
+    # Optimal value of each instance, looked up by its name.
+    Optimals = ReadOptimals(filenames_Opt)
+    OPT_Instances = [Optimals[InstanceName(file)] for file in filenames_Ins]
 
     return Instances, OPT_Instances
 
+def suggest_TS(trial):
+    """
+        suggest_TS (function)
+            Input: trial.
+            Output: Arguments of TabuSearch after MaxOFcalls
+            (TabuSize, minErrorInten).
+            Description: Search space of Tabu search.
+    """
+    TabuSize = trial.suggest_int('TabuSize', 10, 100)
+    minErrorInten = trial.suggest_float('ErrorTolerance', 1e-5, 1e-1, log=True)
+    return TabuSize, minErrorInten
+
+def suggest_GLS(trial):
+    """
+        suggest_GLS (function)
+            Input: trial.
+            Output: Arguments of Guided_Local_Search after
+            MaxOFcalls (alpha,).
+            Description: Search space of GLS.
+    """
+    alpha = trial.suggest_float('alpha', 0.125, 0.5, log=True)
+    return alpha,
+
 def Parametrization_TS(trial, Instances, Opt_Instances):
     """
         Parametrization (Function)
@@ -59,11 +119,11 @@ def Parametrization_TS(trial, Instances, Opt_Instances):
             list of matrix (one each instance).
             Output: Best trial of parameters.
             Description: Do the parametrization prodecure with
-            every trial.
+            every trial. The mean error of the instances done so
+            far is reported after each one (step i).
     """
     # Define intervals.
-    TabuSize = trial.suggest_int('TabuSize', 10, 100)
-    minErrorInten = trial.suggest_float('ErrorTolerance', 1e-5, 1e-1, log=True)
+    TabuSize, minErrorInten = suggest_TS(trial)
 
     # Initializate total normalized error.
     total_normalized_error = 0
@@ -72,7 +132,7 @@ def Parametrization_TS(trial, Instances, Opt_Instances):
     for i in range(num_instances):
         # Run Tabu Search with the parameters from Optuna
         best_n, best_sol = TabuSearch(Instances[i], len(Instances[i]), 80000, 
-                                   TabuSize, minErrorInten)
+                                   TabuSize, minErrorInten, **TS_Options)
 
         objective_value = min(best_sol)
 
@@ -82,6 +142,11 @@ def Parametrization_TS(trial, Instances, Opt_Instances):
         # Sum the normalized error
         total_normalized_error += normalized_error
 
+        # Report the running mean so the pruner can stop bad trials early.
+        trial.report(total_normalized_error / (i + 1), step=i)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+
     # Return the average objective value across all instances
     return total_normalized_error / num_instances
 
@@ -100,10 +165,11 @@ def Parametrization_GLS(trial, Instances, Opt_Instances):
             list of matrix (one each instance).
             Output: Best trial of parameters.
             Description: Do the parametrization prodecure with
-            every trial.
+            every trial. The mean error of the instances done so
+            far is reported after each one (step i).
     """
     # Define intervals.
-    alpha = trial.suggest_float('alpha', 0.125, 0.5, log=True)
+    alpha, = suggest_GLS(trial)
 
     # Initializate total normalized error.
     total_normalized_error = 0
@@ -112,7 +178,7 @@ def Parametrization_GLS(trial, Instances, Opt_Instances):
     for i in range(num_instances):
         # Run Tabu Search with the parameters from Optuna
         best_n, best_sol = Guided_Local_Search(Instances[i], len(Instances[i]), 80000, 
-                                   alpha)
+                                   alpha, **GLS_Options)
 
         objective_value = min(best_sol)
 
@@ -122,6 +188,11 @@ def Parametrization_GLS(trial, Instances, Opt_Instances):
         # Sum the normalized error
         total_normalized_error += normalized_error
 
+        # Report the running mean so the pruner can stop bad trials early.
+        trial.report(total_normalized_error / (i + 1), step=i)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+
     # Return the average objective value across all instances
     return total_normalized_error / num_instances
 
@@ -157,40 +228,175 @@ def save_TS_study_txt(study, output_dir, best_params_file, trials_file):
 
     # Save the trials data in a CSV file
     with open(trials_path, 'w', newline='') as csvfile:
-        fieldnames = ['trial_number', 'value', 'params']
+        fieldnames = ['trial_number', 'state', 'value', 'params']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
         writer.writeheader()
         for trial in study.trials:
             writer.writerow({
                 'trial_number': trial.number,
+                'state': trial.state.name,
                 'value': trial.value,
                 'params': trial.params
             })
 
 
+def Storage():
+    """
+        Storage (function)
+            Output: Optuna storage shared by the processes.
+            Description: SQLite with a long lock timeout, so the
+            workers wait for each other instead of failing.
+    """
+    return optuna.storages.RDBStorage(Storage_URL,
+                                      engine_kwargs={"connect_args": {"timeout": 60}})
+
+def Pruner():
+    """
+        Pruner (function)
+            Output: Pruner of the studies (the storage does not keep
+            it, so every process builds the same one).
+            Description: Median pruner over the per-instance reports.
+    """
+    return optuna.pruners.MedianPruner(n_startup_trials=3, n_warmup_steps=0)
+
+def Parametrization_worker(Study_Name, Capsule, files_Instances, filenames_Opt):
+    """
+        Parametrization_worker (function)
+            Input: Study name, capsule of the objective and files of
+            the instances and optimal values.
+            Output: None.
+            Description: Runs trials of the shared study in this
+            process until the study has N_Trials finished or pruned
+            trials. Instances are evaluated from the smallest, so
+            pruning happens on the cheapest ones.
+    """
+    Instances, Opt_Instances = Read_Content(files_Instances, filenames_Opt)
+    Order = np.argsort([len(Matrix) for Matrix in Instances], kind='stable')
+    Instances = [Instances[i] for i in Order]
+    Opt_Instances = [Opt_Instances[i] for i in Order]
+
+    study = optuna.load_study(study_name=Study_Name, storage=Storage(), pruner=Pruner())
+    study.optimize(Capsule(Instances, Opt_Instances), n_trials=N_Trials,
+                   callbacks=[MaxTrialsCallback(N_Trials, states=(TrialState.COMPLETE,
+                                                                  TrialState.PRUNED))])
+
+def Parametrization_parallel(Study_Name, Capsule, files_Instances, filenames_Opt):
+    """
+        Parametrization_parallel (function)
+            Input: Study name, capsule of the objective
+            (Parametrizartion_TS_capsule or Parametrizartion_GLS_capsule)
+            and files of the instances and optimal values.
+            Output: Study with every trial.
+            Description: Trials run in separate worker processes
+            (no GIL contention) that share the study through the
+            storage. An existing study with the same name is
+            resumed.
+    """
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+    optuna.create_study(study_name=Study_Name, storage=Storage(), pruner=Pruner(),
+                        direction='minimize', load_if_exists=True)
+
+    n = min(Workers or os.cpu_count(), N_Trials)
+    with ProcessPoolExecutor(max_workers=n) as Executor:
+        Futures = [Executor.submit(Parametrization_worker, Study_Name, Capsule,
+                                   files_Instances, filenames_Opt) for _ in range(n)]
+        for Future in Futures:
+            Future.result()
+
+    return optuna.load_study(study_name=Study_Name, storage=Storage(), pruner=Pruner())
+
+def Racing_evaluator(Solver, Arguments, Options, Instances, Opt_Instances):
+    """
+        Racing_evaluator (function)
+            Input: Solver, arguments of every configuration,
+            keyword arguments of the solver (TS_Options or
+            GLS_Options), instances and their optimal values.
+            Output: Evaluate function for race.
+            Description: The alive configurations of a block run in
+            parallel with the same seed (common random numbers) and
+            their normalized errors are returned.
+    """
+    Seeds = np.random.SeedSequence(Seed).spawn(sum(len(I) for _, I in Race_Stages))
+
+    def Evaluate(Alive, Budget, Instance, Block):
+        Tasks = [(0, (Budget,) + tuple(Arguments[c]), Options) for c in Alive]
+        Runs = run_tasks(Solver, [Instances[Instance]], Tasks,
+                         [Seeds[Block]] * len(Tasks), Workers)
+        Opt = Opt_Instances[Instance]
+        return [abs(min(best_sol) - Opt) / Opt for _, best_sol in Runs]
+
+    return Evaluate
+
+def Parametrization_race(Study_Name, Solver, Suggest, Options, files_Instances, filenames_Opt):
+    """
+        Parametrization_race (function)
+            Input: Study name, solver, its search space (suggest_TS or
+            suggest_GLS), its keyword arguments (TS_Options or
+            GLS_Options) and files of the instances and optimal
+            values.
+            Output: Study with every configuration of the race.
+            Description: Race_Configurations configurations are
+            asked to the sampler and raced (Racing.race): cheap
+            instances and short budgets first, bigger ones only for
+            the survivors. The survivors are told their error on the
+            last stage; eliminated ones are pruned after reporting
+            the stages they ran.
+    """
+    Instances, Opt_Instances = Read_Content(files_Instances, filenames_Opt)
+    Order = np.argsort([len(Matrix) for Matrix in Instances], kind='stable')
+    Instances = [Instances[i] for i in Order]
+    Opt_Instances = [Opt_Instances[i] for i in Order]
+
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+    study = optuna.create_study(study_name=Study_Name, storage=Storage(),
+                                direction='minimize', load_if_exists=True)
+    Trials = [study.ask() for _ in range(Race_Configurations)]
+    Arguments = [Suggest(trial) for trial in Trials]
+
+    Survivors, StageErrors = race(Racing_evaluator(Solver, Arguments, Options, Instances,
+                                                   Opt_Instances),
+                                  len(Trials), Race_Stages)
+
+    for c, trial in enumerate(Trials):
+        for step, Error in enumerate(StageErrors[c]):
+            trial.report(Error, step=step)
+        if c in Survivors:
+            study.tell(trial, StageErrors[c][-1])
+        else:
+            study.tell(trial, state=TrialState.PRUNED)
+
+    return study
+
 ########## Procedure ##########
 
-# Obtain TSP's instances.
-Content_Instances = os.listdir(Path_Instances)
-files_Instances = []
-for file in Content_Instances:
-    if(os.path.isfile(os.path.join(Path_Instances,file))):
-        files_Instances.append(Path_Instances+"/"+file)
-
-# Obtain TSP Instances and optimal tour
-# corresponding to each one.
-Instances, Opt_Instances = Read_Content(files_Instances, Path_OPT)
-
-# Parametrization Tabu search.
-"""study = optuna.create_study(direction='minimize')
-study.optimize(Parametrizartion_TS_capsule(Instances, Opt_Instances), n_trials=11, n_jobs=-1)
-best_params = study.best_params
-print('Best parameters:', best_params)
-save_TS_study_txt(study, output_directory ,best_TS_params_file, trials_TS_file)"""
-
-study = optuna.create_study(direction='minimize')
-study.optimize(Parametrizartion_GLS_capsule(Instances, Opt_Instances), n_trials=11, n_jobs=-1)
-best_params = study.best_params
-print('Best parameters:', best_params)
-save_TS_study_txt(study, output_directory ,best_GLS_params_file, trials_GLS_file)
\ No newline at end of file
+if __name__ == '__main__':
+    # Obtain TSP's instances (sorted by name).
+    Content_Instances = sorted(os.listdir(Path_Instances))
+    files_Instances = []
+    for file in Content_Instances:
+        if(os.path.isfile(os.path.join(Path_Instances,file))):
+            files_Instances.append(Path_Instances+"/"+file)
+
+    # Parametrization Tabu search.
+    """if Use_Racing:
+        study = Parametrization_race('TS-race', TabuSearch, suggest_TS, TS_Options,
+                                     files_Instances, Path_OPT)
+    else:
+        study = Parametrization_parallel('TS', Parametrizartion_TS_capsule,
+                                         files_Instances, Path_OPT)
+    best_params = study.best_params
+    print('Best parameters:', best_params)
+    save_TS_study_txt(study, output_directory ,best_TS_params_file, trials_TS_file)"""
+
+    if Use_Racing:
+        study = Parametrization_race('GLS-race', Guided_Local_Search, suggest_GLS, GLS_Options,
+                                     files_Instances, Path_OPT)
+    else:
+        study = Parametrization_parallel('GLS', Parametrizartion_GLS_capsule,
+                                         files_Instances, Path_OPT)
+    best_params = study.best_params
+    print('Best parameters:', best_params)
+    save_TS_study_txt(study, output_directory ,best_GLS_params_file, trials_GLS_file)
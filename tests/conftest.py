@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of Libraries import each other by name, as in the scripts.
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Libraries'))
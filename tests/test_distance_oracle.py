@@ -0,0 +1,37 @@
+import numpy as np
+
+from ReadTSP import CoordinateDistanceMatrix, DistanceOracle
+
+
+def counting_oracle(n=50, **Options):
+    Points = np.random.default_rng(0).random((n, 2)) * 1000
+    Oracle = DistanceOracle(Points, 'EUC_2D', dtype='int32', **Options)
+    Computed = []
+    Compute = Oracle._distances
+    Oracle._distances = lambda A, B: Computed.append(1) or Compute(A, B)
+    return Oracle, Computed, CoordinateDistanceMatrix(Points, 'EUC_2D', dtype='int32')
+
+
+def test_scalar_reads_fill_and_refresh_the_pair_cache():
+    Oracle, Computed, Matrix = counting_oracle(CachePairs=2)
+    assert Oracle[1, 2] == Matrix[1, 2] and len(Computed) == 1
+    assert Oracle[2, 1] == Matrix[2, 1] and len(Computed) == 1     # Hit (symmetric)
+    assert Oracle[3, 4] == Matrix[3, 4] and len(Computed) == 2
+    assert Oracle[1, 2] == Matrix[1, 2] and len(Computed) == 2     # Hit, now most recent
+    assert Oracle[5, 6] == Matrix[5, 6] and len(Computed) == 3     # Evicts (3, 4)
+    assert list(Oracle._pairs) == [(1, 2), (5, 6)]
+    assert Oracle[3, 4] == Matrix[3, 4] and len(Computed) == 4     # Miss again
+    assert Oracle[1][2] == Matrix[1, 2] and len(Computed) == 5     # (1, 2) was evicted
+
+
+def test_reads_use_and_refresh_cached_rows():
+    Oracle, Computed, Matrix = counting_oracle(CacheRows=2)
+    np.testing.assert_array_equal(Oracle.row(1), Matrix[1])
+    np.testing.assert_array_equal(Oracle.row(2), Matrix[2])
+    assert len(Computed) == 2
+    assert Oracle[1, 7] == Matrix[1, 7]                             # From row 1, refreshes it
+    np.testing.assert_array_equal(Oracle[1, [3, 4]], Matrix[1, [3, 4]])
+    assert len(Computed) == 2 and not Oracle._pairs
+    Oracle.row(3)                                                   # Evicts row 2
+    assert list(Oracle._rows) == [1, 3]
+    assert Oracle[2, 7] == Matrix[2, 7] and len(Computed) == 4
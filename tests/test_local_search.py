@@ -0,0 +1,22 @@
+import warnings
+
+import numpy as np
+
+from LocalSearch import local_search
+from TabuSearch import ObjFun
+
+
+def test_int16_matrix_gains_do_not_overflow():
+    # Distances below 32767 whose sums of two or three edges go past it.
+    Points = np.random.default_rng(0).random((200, 2)) * 20000
+    D32 = np.rint(np.hypot(*(Points[:, None] - Points[None]).transpose(2, 0, 1))).astype(np.int32)
+    D16 = D32.astype(np.int16)
+    assert D16.max() < 32767 < 3 * int(D16.max())
+    Start = np.random.default_rng(1).permutation(200) + 1
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        Tour16, _, Change16 = local_search(Start, D16)
+    Tour32, _, Change32 = local_search(Start, D32)
+    assert np.array_equal(Tour16, Tour32)
+    assert Change16 == Change32 == ObjFun(Tour16, D32) - ObjFun(Start, D32)
@@ -0,0 +1,15 @@
+import numpy as np
+
+from TabuSearch import ObjFun, TabuSearch
+
+
+def test_trace_is_not_empty_when_every_iteration_intensifies():
+    Points = np.random.default_rng(0).random((60, 2)) * 1000
+    D = np.rint(np.hypot(*(Points[:, None] - Points[None]).transpose(2, 0, 1)))
+    Start = np.random.default_rng(1).permutation(60) + 1
+
+    # minErrorInten = inf sends every iteration to the intensification branch.
+    bests_n, best_sol = TabuSearch(D, 60, 20000, 10, np.inf, rng=np.random.default_rng(0),
+                                   InitialSolution=Start)
+    assert len(bests_n) == len(best_sol) == 1
+    assert min(best_sol) == ObjFun(Start, D)
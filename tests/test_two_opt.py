@@ -0,0 +1,58 @@
+import numpy as np
+
+from TabuSearch import (ObjFun, apply_two_opt, best_neighbor, get_neighbors_2opt,
+                        two_opt_moves)
+from TabuMemory import new_tabu_memory
+from Candidates import candidate_lists, candidate_moves
+from Tour import Tour
+
+
+def random_matrix(n, seed=0):
+    Points = np.random.default_rng(seed).random((n, 2)) * 1000
+    return np.rint(np.hypot(*(Points[:, None] - Points[None]).transpose(2, 0, 1)))
+
+
+def two_opt_optimum(D, seed=0):
+    # Steepest 2-opt descent over the real moves until none improves.
+    n = len(D)
+    Solution = Tour(np.random.default_rng(seed).permutation(n) + 1)
+    while True:
+        I, J, Delta = get_neighbors_2opt(Solution, D)
+        Real = J - I < n - 2
+        k = int(np.argmin(np.where(Real, Delta, np.inf)))
+        if Delta[k] >= 0:
+            return Solution
+        apply_two_opt(Solution, I[k], J[k])
+
+
+def test_degenerate_moves_are_scored_zero():
+    D = random_matrix(40)
+    n = len(D)
+    Solution = np.random.default_rng(1).permutation(n) + 1
+    I, J, Delta = get_neighbors_2opt(Solution, D)
+    Degenerate = J - I >= n - 2
+    assert {(int(i), int(j)) for i, j in zip(I[Degenerate], J[Degenerate])} == \
+        {(0, n - 1), (0, n - 2), (1, n - 1)}
+    assert np.all(Delta[Degenerate] == 0)
+
+
+def test_best_neighbor_skips_same_cycle_moves_at_local_optimum():
+    D = random_matrix(60)
+    n = len(D)
+    Solution = two_opt_optimum(D)
+    Cost = ObjFun(Solution, D)
+    I, J, Delta = Neighborhood = get_neighbors_2opt(Solution, D)
+
+    Neighbor_f, (i, j) = best_neighbor(Solution, Neighborhood, new_tabu_memory(n), 0, Cost, Cost)
+    assert j - i < n - 2
+    assert Neighbor_f - Cost == Delta[J - I < n - 2].min() > 0
+
+
+def test_candidate_moves_skip_same_cycle_moves():
+    D = random_matrix(30)
+    n = len(D)
+    Solution = np.random.default_rng(2).permutation(n) + 1
+    I, J = candidate_moves(Solution, candidate_lists(n - 1, D))
+    assert np.all(J - I >= 2) and np.all(J - I < n - 2)
+    Full_I, Full_J = two_opt_moves(n)
+    assert len(I) == np.count_nonzero(Full_J - Full_I < n - 2)